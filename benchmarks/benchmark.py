@@ -0,0 +1,222 @@
+import argparse
+from datetime import datetime
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+dirPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(dirPath))
+import optimeet
+from servers import When2MeetServer, SMTPSink
+from when2meetpages import DAYS, when2MeetPage
+
+SCALES = {
+    'small': {
+        'people': 10,
+        'meetings': 5,
+        'participantsPerMeeting': 3,
+        'days': DAYS[1:6],
+        'hours': (9, 17),
+        'respondFraction': 0.5,
+        'density': 0.6,
+        'repeat': 20
+    },
+    'medium': {
+        'people': 100,
+        'meetings': 40,
+        'participantsPerMeeting': 8,
+        'days': DAYS[1:6],
+        'hours': (8, 20),
+        'respondFraction': 0.7,
+        'density': 0.5,
+        'repeat': 5
+    },
+    'huge': {
+        'people': 600,
+        'meetings': 300,
+        'participantsPerMeeting': 30,
+        'days': DAYS,
+        'hours': (6, 22),
+        'respondFraction': 0.8,
+        'density': 0.4,
+        'repeat': 2
+    }
+}
+
+'''
+Returns:
+ - Fastest and mean time (in seconds) taken by f over some number of runs
+ - Value returned by f on its last run
+'''
+def timeIt(f, repeat):
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        ret = f()
+        times.append(time.perf_counter() - start)
+    return min(times), sum(times) / len(times), ret
+
+'''
+Creates a scheduling round (people, config, and input file) of the given scale in dirname, pointed
+  at the local when2meet and SMTP stand-ins
+Returns:
+ - Path to the input file
+'''
+def setUpRound(dirname, scale, when2meetServer, smtpSink, progressStore):
+    rnd = random.Random(0)
+    people = {f'p{i}': {'name': f'First{i} Last{i}', 'email': f'p{i}@example.com'} for i in range(scale['people'])}
+    optimeet.__people = people
+    optimeet.__config = {
+        **optimeet.loadConfig(),
+        'name': 'Benchmark',
+        'emailAddress': 'benchmark@example.com',
+        'emailServer': '127.0.0.1',
+        'emailPort': smtpSink.port,
+        'emailUseSSL': False,
+        'emailsPerSecond': 100000,
+        'when2meetServer': when2meetServer.url,
+        'progressStore': progressStore
+    }
+    optimeet.__emailPassword = 'benchmark'
+
+    earliest = optimeet.slot2time(scale['hours'][0] * 2)
+    latest = optimeet.slot2time(scale['hours'][1] * 2 - 1)
+    inp = {
+        'myAvailability': {day: [[earliest, latest]] for day in scale['days']},
+        'myCommitments': {},
+        'myLocations': {'remote': 'https://example.com/zoom'},
+        'meetingsToSchedule': [{
+            'name': f'Meeting {i}',
+            'type': 'remote',
+            'participants': rnd.sample(sorted(people.keys()), scale['participantsPerMeeting'])
+        } for i in range(scale['meetings'])]
+    }
+    inputFilename = os.path.join(dirname, 'benchmark.json')
+    with open(inputFilename, 'w') as f:
+        json.dump(inp, f, indent=3)
+    return inputFilename
+
+'''
+Replaces the (empty) page of every meeting's when2meet with one that some of its participants have
+  filled out
+Returns:
+ - Dictionary from meeting name to the HTML of its page
+'''
+def fillOutWhen2Meets(inp, scale, when2meetServer):
+    people = optimeet.loadPeople()
+    pages = {}
+    for i,meeting in enumerate(inp['meetingsToSchedule']):
+        nrespondents = int(len(meeting['participants']) * scale['respondFraction'])
+        respondents = [(people[p]['name'], 1000 + j) for j,p in enumerate(meeting['participants'][:nrespondents])]
+        html = when2MeetPage(scale['days'], *scale['hours'], respondents, scale['density'], seed=i)
+        when2meetServer.setEvent(meeting['when2meet'].split('?')[-1], html)
+        pages[meeting['name']] = html
+    return pages
+
+def runScale(name, scale, progressStore):
+    when2meetServer = When2MeetServer().start()
+    smtpSink = SMTPSink().start()
+    results = {}
+    def record(scenario, best, mean, repeat, **extra):
+        results[scenario] = {'seconds': best, 'meanSeconds': mean, 'repeat': repeat, **extra}
+        print(f'  {scenario:<24} {best:10.4f} s' + ''.join(f'  {k}={v}' for k,v in extra.items()))
+
+    with tempfile.TemporaryDirectory() as dirname:
+        inputFilename = setUpRound(dirname, scale, when2meetServer, smtpSink, progressStore)
+        inp = optimeet.loadInputFile(inputFilename)
+
+        best, mean, _ = timeIt(lambda: optimeet.makeWhen2Meets(inputFilename, inp), 1)
+        record('createWhen2Meets', best, mean, 1, meetings=len(inp['meetingsToSchedule']))
+        pages = fillOutWhen2Meets(inp, scale, when2meetServer)
+        optimeet.createProgressFile(inputFilename, inp)
+
+        # Parse the largest page
+        meeting = max(inp['meetingsToSchedule'], key=lambda m: len(pages[m['name']]))
+        page = pages[meeting['name']].encode('utf-8')
+        parse = lambda: optimeet.parseWhen2MeetHTML(page, meeting['participants'], inp['myAvailability'])
+        best, mean, _ = timeIt(parse, scale['repeat'])
+        record('parse', best, mean, scale['repeat'], pageBytes=len(page), MBPerSecond=round(len(page) / best / 1e6, 2))
+
+        when2meets = [(m, optimeet.parseWhen2MeetHTML(pages[m['name']], m['participants'], inp['myAvailability']))
+            for m in inp['meetingsToSchedule']]
+        viability = lambda: [optimeet.numViableMeetingTimes(w, m['length'], optimeet.respondents(w)) for m,w in when2meets]
+        best, mean, _ = timeIt(viability, scale['repeat'])
+        record('viability', best, mean, scale['repeat'], meetings=len(when2meets))
+        batch = lambda: optimeet.batchViability([w for m,w in when2meets], [m['length'] for m,w in when2meets],
+            [optimeet.respondents(w) for m,w in when2meets])
+        best, mean, _ = timeIt(batch, scale['repeat'])
+        record('batchViability', best, mean, scale['repeat'], numpy=optimeet.np is not None)
+
+        requests = when2meetServer.requests
+        best, mean, _ = timeIt(lambda: optimeet.checkProgress(inputFilename, verbose=False), 1)
+        record('checkProgress (cold)', best, mean, 1, requests=when2meetServer.requests - requests)
+        requests = when2meetServer.requests
+        best, mean, _ = timeIt(lambda: optimeet.checkProgress(inputFilename, verbose=False), scale['repeat'])
+        record('checkProgress (warm)', best, mean, scale['repeat'], requests=(when2meetServer.requests - requests) // scale['repeat'])
+
+        messages = smtpSink.messages
+        best, mean, _ = timeIt(lambda: optimeet.sendReminderEmails(inputFilename, verbose=False), 1)
+        record('sendReminderEmails', best, mean, 1, emails=smtpSink.messages - messages, connections=smtpSink.connections)
+
+        best, mean, _ = timeIt(lambda: optimeet.saveFinalAvailability(inputFilename), 1)
+        record('saveFinalAvailability', best, mean, 1)
+        best, mean, _ = timeIt(lambda: optimeet.createInterfaceHTML(inputFilename), scale['repeat'])
+        record('createInterfaceHTML', best, mean, scale['repeat'], bytes=os.path.getsize(optimeet.interfaceFilename(inputFilename)))
+
+    optimeet.closeSMTPSessions()
+    when2meetServer.stop()
+    smtpSink.stop()
+    return results
+
+'''
+Prints how long each scenario took relative to the previously saved results (if any)
+'''
+def compareResults(previous, current):
+    for scale,scenarios in current['scales'].items():
+        if not (scale in previous.get('scales', {})):
+            continue
+        print(f'{scale} (relative to {previous["timestamp"]}):')
+        for scenario,result in scenarios.items():
+            if scenario in previous['scales'][scale]:
+                ratio = result['seconds'] / max(previous['scales'][scale][scenario]['seconds'], 1e-9)
+                flag = '  <-- slower' if ratio > 1.2 else ''
+                print(f'  {scenario:<24} {ratio:6.2f}x{flag}')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Runs Optimeet benchmarks against local stand-ins for when2meet and an SMTP server')
+    parser.add_argument('scales',
+        nargs='*',
+        choices=list(SCALES.keys()),
+        default=['small', 'medium'],
+        help='Scales at which to run the benchmarks (defaults to small and medium)')
+    parser.add_argument('--output',
+        type=str,
+        default=os.path.join(dirPath, 'results.json'),
+        help='File to which results are saved (and against which they are compared, if it already exists)')
+    parser.add_argument('--progressStore',
+        type=str,
+        choices=['json', 'sqlite'],
+        default='json',
+        help='Progress store to use (see "progressStore" in the README)')
+    args = parser.parse_args()
+
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'progressStore': args.progressStore,
+        'scales': {}
+    }
+    for scale in args.scales:
+        print(f'{scale}:')
+        results['scales'][scale] = runScale(scale, SCALES[scale], args.progressStore)
+
+    if os.path.exists(args.output):
+        with open(args.output) as f:
+            compareResults(json.load(f), results)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=3)
+    print(f'Results saved to {args.output}')
@@ -0,0 +1,153 @@
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import socketserver
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+from when2meetpages import DAYS, when2MeetPage, newEventRedirectPage
+
+'''
+Local stand-in for when2meet.com.
+Serves 'SaveNewEvent.php' (which creates an empty event, like the real thing) and the event pages
+  themselves, with ETags so that conditional requests can be answered with 304 Not Modified.
+Connections are kept alive, as they are by the real server.
+'''
+class When2MeetServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0):
+        super().__init__(('127.0.0.1', port), When2MeetHandler)
+        self.pages = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.eventIds = itertools.count(10000000)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}'
+
+    '''
+    Adds (or replaces) the page for an event
+    Returns:
+     - URL of the event page
+    '''
+    def setEvent(self, eventId, html):
+        with self.lock:
+            self.pages[eventId] = html.encode('utf-8')
+        return f'{self.url}/?{eventId}'
+
+    def newEventId(self):
+        with self.lock:
+            return f'{next(self.eventIds)}-bEnCh'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+class When2MeetHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self, status, body=b'', headers={}):
+        self.send_response(status)
+        for key,value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+        url = urlsplit(self.path)
+        if url.path == '/SaveNewEvent.php':
+            self.saveNewEvent(parse_qs(url.query))
+            return
+        page = self.server.pages.get(url.query)
+        if page is None:
+            self.respond(404)
+            return
+        etag = '"' + hashlib.sha1(page).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.respond(304, headers={'ETag': etag})
+        else:
+            self.respond(200, page, {'ETag': etag, 'Content-Type': 'text/html; charset=utf-8'})
+
+    do_POST = do_GET
+
+    def saveNewEvent(self, fields):
+        days = fields['PossibleDates'][0].split('|')
+        if fields['DateTypes'][0] == 'DaysOfTheWeek':
+            days = [DAYS[int(d)] for d in days]
+        earliestHour = int(fields['NoEarlierThan'][0])
+        latestHour = int(fields['NoLaterThan'][0])
+        eventId = self.server.newEventId()
+        self.server.setEvent(eventId, when2MeetPage(days, earliestHour, latestHour))
+        self.respond(200, newEventRedirectPage(eventId).encode('utf-8'), {'Content-Type': 'text/html'})
+
+'''
+Local SMTP server that accepts (and counts) every message sent to it without delivering anything.
+It doesn't advertise STARTTLS or AUTH, so Optimeet neither encrypts nor logs in when sending to it
+  (set "emailUseSSL" to false).
+'''
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0):
+        super().__init__(('127.0.0.1', port), SMTPSinkHandler)
+        self.messages = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        self.reply('220 localhost SMTP sink')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', errors='replace').strip().split(' ')[0].upper()
+            if command == 'EHLO':
+                self.reply('250-localhost')
+                self.reply('250 8BITMIME')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line == b'.\r\n':
+                        break
+                with self.server.lock:
+                    self.server.messages += 1
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            elif command in ('HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.reply('250 OK')
+            else:
+                self.reply('502 Command not implemented')
@@ -0,0 +1,53 @@
+from datetime import date
+import random
+
+DAYS = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+# A real when2meet page carries a lot of markup and script that Optimeet doesn't care about; this is
+#  repeated between the parts it does care about so that synthetic pages are roughly as large
+FILLER = '<div class="filler" style="display:none">' + 'x' * 200 + '</div>\n'
+
+'''
+Generates the HTML of a when2meet page, containing the same ShowSlot, TimeOfSlot, PeopleNames,
+  PeopleIDs and AvailableAtSlot markup as a real one.
+Arguments:
+ - days: List of days of the week, or of dates (YYYY-MM-DD), covered by the when2meet
+ - earliestHour, latestHour: Range of hours (0-24) covered by the when2meet on each day
+ - respondents: List of (name, when2meet person ID) pairs for people who have filled it out
+ - density: Probability that a respondent is available at any given 15 minute slot
+ - seed: Random seed, so that the same arguments always produce the same page
+'''
+def when2MeetPage(days, earliestHour, latestHour, respondents=[], density=0.5, seed=0):
+    rnd = random.Random(seed)
+    lines = ['<!DOCTYPE html>', '<html>', '<head><title>when2meet</title></head>', '<body>', FILLER * 20, '<script type="text/javascript">']
+    slotId = 1641186000
+    index = 0
+    available = []
+    for day in days:
+        if not (day in DAYS):
+            # Slots of when2meets over specific dates are labeled with the date
+            day = date.fromisoformat(day).strftime('%a %b %d %Y')
+        for hour in range(earliestHour, latestHour):
+            for minute in (0, 15, 30, 45):
+                hour12 = (hour + 11) % 12 + 1
+                ampm = 'AM' if hour < 12 else 'PM'
+                lines.append(f'ShowSlot({slotId},"{day} {hour12:02d}:{minute:02d}:00 {ampm}");')
+                lines.append(f'TimeOfSlot[{index}]={slotId};')
+                for name,personId in respondents:
+                    if rnd.random() < density:
+                        available.append(f'AvailableAtSlot[{index}].push({personId});')
+                slotId += 900
+                index += 1
+        lines.append(FILLER)
+    for i,(name,personId) in enumerate(respondents):
+        lines.append(f"PeopleNames[{i}] = '{name}';PeopleIDs[{i}] = {personId};")
+    lines += available
+    lines += ['</script>', FILLER * 20, '</body>', '</html>']
+    return '\n'.join(lines)
+
+'''
+Returns:
+ - The HTML that when2meet sends back after creating a new event, which redirects to the event page
+'''
+def newEventRedirectPage(eventId):
+    return f"<html><body><script>window.location='./?{eventId}';</script></body></html>"
@@ -1,192 +1,935 @@
 import argparse
-from datetime import datetime, timedelta
-from functools import reduce
+import asyncio
+import base64
+import bisect
+import codecs
+from collections import OrderedDict
+import cProfile
+import csv
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache, reduce, wraps
 from getpass import getpass
+import glob
+import gzip
+import hashlib
+import http.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
 import json
+import multiprocessing
 import os
+from pathlib import Path
+import pstats
 import re
 import sys
 import schedule
 import smtplib
+import sqlite3
 import ssl
 import textwrap
+import threading
 import time
-from urllib.parse import urlencode
-from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+from urllib.parse import parse_qs, urlencode, urljoin, urlsplit
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 DAYS = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-THIRTYMINS = timedelta(minutes=30)
 
 '''
+Times of day are represented internally as half-hour slot numbers (minutes since midnight / 30);
+  they are only converted to/from "%I:%M %p" strings when reading or writing files, emails, and HTML
+'''
+SLOTSPERDAY = 48
+SLOTTIMES = [f'{(slot // 2 + 11) % 12 + 1:02d}:{30 * (slot % 2):02d} {"AM" if slot < 24 else "PM"}' for slot in range(SLOTSPERDAY)]
+TIMEREGEX = re.compile(r'\s*(\d{1,2}):(\d\d)\s*([AaPp][Mm])\s*$')
+
+@lru_cache(maxsize=None)
+def time2minutes(timestr):
+    match = TIMEREGEX.match(timestr)
+    if match is None or not (1 <= int(match.group(1)) <= 12) or int(match.group(2)) >= 60:
+        raise ValueError(f'Invalid time "{timestr}" (expected a time such as "9:00 AM")')
+    hours = int(match.group(1)) % 12 + (12 if match.group(3).upper() == 'PM' else 0)
+    return 60*hours + int(match.group(2))
+
+def time2slot(timestr):
+    return time2minutes(timestr) // 30
+
+def slot2time(slot):
+    return SLOTTIMES[slot]
+
+'''
+Metrics are collected for the whole process: counters (e.g. bytes fetched, emails sent) and, for each
+  named phase of work, how many times it ran and the total time spent in it
+'''
+__metricCounters = {}
+__metricPhases = {}
+__metricsLock = threading.Lock()
+
+def countMetric(name, amount=1):
+    with __metricsLock:
+        __metricCounters[name] = __metricCounters.get(name, 0) + amount
+
+@contextmanager
+def timedPhase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with __metricsLock:
+            count, seconds = __metricPhases.get(name, (0, 0.0))
+            __metricPhases[name] = (count + 1, seconds + elapsed)
+
+def metricsSnapshot():
+    with __metricsLock:
+        return dict(__metricCounters), dict(__metricPhases)
+
+'''
+Returns:
+ - The counters and phases (as (count, seconds) pairs) accumulated since an earlier snapshot (see
+   metricsSnapshot), leaving out those that haven't changed
+'''
+def metricsSince(countersBefore, phasesBefore):
+    counters, phases = metricsSnapshot()
+    counterDeltas = {name: value - countersBefore.get(name, 0) for name,value in counters.items() if value != countersBefore.get(name, 0)}
+    phaseDeltas = {}
+    for name,(count,seconds) in phases.items():
+        countBefore, secondsBefore = phasesBefore.get(name, (0, 0.0))
+        if count > countBefore:
+            phaseDeltas[name] = (count - countBefore, seconds - secondsBefore)
+    return counterDeltas, phaseDeltas
+
+'''
+Adds counters and phases accumulated elsewhere (i.e. in a worker process) to this process's
+'''
+def mergeMetrics(counters, phases):
+    with __metricsLock:
+        for name,value in counters.items():
+            __metricCounters[name] = __metricCounters.get(name, 0) + value
+        for name,(count,seconds) in phases.items():
+            countBefore, secondsBefore = __metricPhases.get(name, (0, 0.0))
+            __metricPhases[name] = (countBefore + count, secondsBefore + seconds)
+
+# Worker processes (see initWorker) send their metrics back to the main process rather than
+#  exporting them themselves
+__inWorker = False
+
+'''
+Times one top-level operation (e.g. a progress check) on an input file. When it finishes, a line
+  with the time spent in each phase and the counters accumulated during the operation is appended
+  to the "metricsLog" file, and the "metricsPrometheusFile" is rewritten with the process's totals
+  (if these are configured).
+Since metrics are collected for the whole process, operations that overlap (e.g. in 'serve') will
+  each include the other's phases and counters. Operations run in worker processes don't export
+  anything; their metrics are merged into those of the operation that started them.
+'''
+@contextmanager
+def operationMetrics(operation, inputFilename):
+    countersBefore, phasesBefore = metricsSnapshot()
+    try:
+        with timedPhase(operation):
+            yield
+    finally:
+        config = loadConfig()
+        if config['metricsLog'] and not __inWorker:
+            counterDeltas, phaseDeltas = metricsSince(countersBefore, phasesBefore)
+            entry = {
+                'time': datetime.now().isoformat(),
+                'operation': operation,
+                'input': os.path.abspath(inputFilename),
+                'seconds': phaseDeltas[operation][1],
+                'phases': {name: {'count': count, 'seconds': seconds} for name,(count,seconds) in phaseDeltas.items()},
+                'counters': counterDeltas
+            }
+            with __metricsLock:
+                with open(config['metricsLog'], 'a') as f:
+                    f.write(json.dumps(entry) + '\n')
+        if config['metricsPrometheusFile'] and not __inWorker:
+            savePrometheusMetrics(config['metricsPrometheusFile'], *metricsSnapshot())
+
+'''
+Decorator that runs an operation on an input file (whose first argument is the input filename)
+  under operationMetrics
+'''
+def instrumentedOperation(f):
+    @wraps(f)
+    def wrapper(inputFilename, *args, **kwargs):
+        with operationMetrics(f.__name__, inputFilename):
+            return f(inputFilename, *args, **kwargs)
+    return wrapper
+
+def savePrometheusMetrics(filename, counters, phases):
+    lines = [
+        '# HELP optimeet_phase_seconds_total Total time spent in each phase of work',
+        '# TYPE optimeet_phase_seconds_total counter'
+    ]
+    lines += [f'optimeet_phase_seconds_total{{phase="{name}"}} {seconds}' for name,(count,seconds) in sorted(phases.items())]
+    lines += [
+        '# HELP optimeet_phase_runs_total Number of times each phase of work has run',
+        '# TYPE optimeet_phase_runs_total counter'
+    ]
+    lines += [f'optimeet_phase_runs_total{{phase="{name}"}} {count}' for name,(count,seconds) in sorted(phases.items())]
+    for name,value in sorted(counters.items()):
+        metric = 'optimeet_' + re.sub(r'([A-Z])', r'_\1', name).lower() + '_total'
+        lines += [f'# TYPE {metric} counter', f'{metric} {value}']
+    with __metricsLock:
+        with open(filename + '.tmp', 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(filename + '.tmp', filename)
+
+'''
+Runs f under cProfile, saves the profile to filename, and prints the functions in which the most
+  time was spent
+'''
+def profileCall(filename, f, *args):
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(f, *args)
+    finally:
+        profiler.dump_stats(filename)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+        print(f'Profile saved to {filename} (view it with e.g. "python -m pstats {filename}")')
+
+'''
+Keep-alive HTTP(S) connections, pooled per host and shared by all threads
+'''
+__httpConnections = {}
+__httpLock = threading.Lock()
+TRANSIENTHTTPSTATUSES = [429, 500, 502, 503, 504]
+
+'''
+Returns:
+ - A connection to the host
+ - Whether that connection is an idle one being reused
+'''
+def acquireHTTPConnection(scheme, host, reuse=True):
+    with __httpLock:
+        idle = __httpConnections.get((scheme, host), [])
+        if reuse and len(idle) > 0:
+            return idle.pop(), True
+    if scheme == 'https':
+        return http.client.HTTPSConnection(host, timeout=30, context=ssl.create_default_context()), False
+    return http.client.HTTPConnection(host, timeout=30), False
+
+def releaseHTTPConnection(scheme, host, conn):
+    with __httpLock:
+        __httpConnections.setdefault((scheme, host), []).append(conn)
+
+'''
+GETs a URL over a pooled keep-alive connection, following redirects and retrying transient
+  failures (connection errors and 429/5xx responses) with exponential backoff.
+A request that is not idempotent (e.g. one that creates a when2meet) is never retried, since a
+  failed attempt may still have taken effect, and is sent on a new connection so that it doesn't
+  fail on one that the server has closed.
+Returns:
+ - The response status (e.g. 304 if the request was conditional and the page has not changed)
+ - The response headers
+ - The response body (bytes)
+'''
+def httpFetch(url, headers={}, retries=None, backoff=1.0, idempotent=True):
+    if not idempotent:
+        retries = 0
+    elif retries is None:
+        retries = loadConfig()['fetchRetries']
+    redirects = 0
+    attempt = 0
+    while True:
+        parts = urlsplit(url)
+        path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        conn, reused = acquireHTTPConnection(parts.scheme, parts.netloc, reuse=idempotent)
+        try:
+            conn.request('GET', path, headers={'Connection': 'keep-alive', 'User-Agent': 'optimeet', **headers})
+            resp = conn.getresponse()
+            body = resp.read()
+        except (http.client.HTTPException, OSError) as e:
+            conn.close()
+            # The server may have closed an idle connection; retry straight away on a new one
+            if reused:
+                continue
+            error = e
+        else:
+            countMetric('bytesFetched', len(body))
+            if resp.will_close:
+                conn.close()
+            else:
+                releaseHTTPConnection(parts.scheme, parts.netloc, conn)
+            if resp.status in [301, 302, 303, 307, 308] and resp.getheader('Location') and redirects < 5:
+                url = urljoin(url, resp.getheader('Location'))
+                redirects += 1
+                continue
+            if resp.status < 400:
+                return resp.status, resp.headers, body
+            error = HTTPError(url, resp.status, resp.reason, resp.headers, None)
+            if not (resp.status in TRANSIENTHTTPSTATUSES):
+                raise error
+        if attempt >= retries:
+            raise error
+        countMetric('fetchRetries')
+        time.sleep(backoff * 2**attempt)
+        attempt += 1
+
+def httpGet(url):
+    return httpFetch(url)[2]
+
+__fetchPool = None
+def getFetchPool():
+    global __fetchPool
+    if __fetchPool is None:
+        __fetchPool = ThreadPoolExecutor(max_workers=loadConfig()['fetchConcurrency'])
+    return __fetchPool
+
+'''
+Downloads a batch of pages concurrently.
+If validators maps a URL to the 'etag'/'lastModified' of a previous download, the request for that
+  URL is made conditional on the page having changed since then.
+Returns:
+ - Dictionary from URL to the exception raised while fetching it, or to a dictionary with the fields:
+   - 'page': Raw page contents (bytes), or None if the page has not changed
+   - 'etag', 'lastModified': Validators for the next conditional request (or None)
+'''
+def fetchPages(urls, validators={}):
+    def fetch(url):
+        headers = {}
+        v = validators.get(url, {})
+        if v.get('etag'):
+            headers['If-None-Match'] = v['etag']
+        if v.get('lastModified'):
+            headers['If-Modified-Since'] = v['lastModified']
+        status, respHeaders, body = httpFetch(url, headers)
+        countMetric('pagesNotModified' if status == 304 else 'pagesFetched')
+        return {
+            'page': None if status == 304 else body,
+            'etag': respHeaders.get('ETag', v.get('etag')),
+            'lastModified': respHeaders.get('Last-Modified', v.get('lastModified'))
+        }
+    urls = list(dict.fromkeys(urls))
+    futures = {url: getFetchPool().submit(fetch, url) for url in urls}
+    pages = {}
+    for url,future in futures.items():
+        try:
+            pages[url] = future.result()
+        except Exception as e:
+            pages[url] = e
+    return pages
+
+'''
+Creates a when2meet covering the given days, which are either days of the week or specific dates
+  (see roundDays)
 Returns:
  - URL of created when2meet
 '''
-def createWhen2Meet(name, timeZone, daysOfWeek, earliestTime, latestTime):
-    possibleDates = "|".join([str(DAYS.index(day)) for day in daysOfWeek])
-    earliestTime = datetime.strptime(earliestTime, "%I:%M %p").hour
-    latestTime = datetime.strptime(latestTime, "%I:%M %p").hour
-    url = 'https://when2meet.com/SaveNewEvent.php'
+def createWhen2Meet(name, timeZone, days, earliestTime, latestTime):
+    if all(isDate(day) for day in days):
+        dateTypes = 'SpecificDates'
+        possibleDates = "|".join(days)
+    else:
+        dateTypes = 'DaysOfTheWeek'
+        possibleDates = "|".join([str(DAYS.index(day)) for day in days])
+    earliestTime = time2minutes(earliestTime) // 60
+    latestTime = time2minutes(latestTime) // 60
+    server = loadConfig()['when2meetServer']
+    url = server + '/SaveNewEvent.php'
     post_fields = {
         'NewEventName': f'{name} ({timeZone})',
-        'DateTypes': 'DaysOfTheWeek',
+        'DateTypes': dateTypes,
         'PossibleDates': possibleDates,
         'NoEarlierThan': earliestTime,
         'NoLaterThan': latestTime,
         'TimeZone': timeZone
     }
-    r = Request(url + '?' + urlencode(post_fields))
-    html = urlopen(r).read().decode()
+    html = httpFetch(url + '?' + urlencode(post_fields), idempotent=False)[2].decode()
     match = re.search(r"window.location='./(\?[a-zA-Z0-9-]+)'", html)
     when2meet_id = match.group(1)
-    return 'https://when2meet.com/' + when2meet_id
+    return server + '/' + when2meet_id
+
+DATEREGEX = re.compile(r'\d{4}-\d\d-\d\d$')
+
+def isDate(day):
+    return DATEREGEX.match(day) is not None
+
+def weekdayOf(isodate):
+    return DAYS[(date.fromisoformat(isodate).weekday() + 1) % 7]
+
+'''
+A round is scheduled over either the days of the week (DAYS), or a list of specific dates
+  ("YYYY-MM-DD"); the days of a round are the keys of its (normalized) "myAvailability", in order
+'''
+def roundDays(myAvailability):
+    return list(myAvailability.keys())
+
+'''
+Availability is represented compactly as integer bitmasks over the half-hour slots of a round:
+  bit (days.index(day) * SLOTSPERDAY + slot) is set if that slot is included, where days is the
+  list of days of the round (see roundDays).
+Masks are built and taken apart through their bytes or binary strings rather than one bit at a
+  time, so that this takes time linear in the number of slots, even for rounds spanning many weeks.
+'''
+def indices2mask(indices):
+    indices = list(indices)
+    if len(indices) == 0:
+        return 0
+    bits = bytearray(max(indices) // 8 + 1)
+    for index in indices:
+        bits[index >> 3] |= 1 << (index & 7)
+    return int.from_bytes(bits, 'little')
 
 '''
 Returns:
- - Dictionary of Sa|M|T|W|Th|F|Su, each day maps to a list of half-hour slots, each slot has a time
-   and a list of people who are available then
+ - String of '0's and '1's (at least nbits long) whose character i is bit i of mask
+'''
+def maskBits(mask, nbits=0):
+    return format(mask, 'b')[::-1].ljust(nbits, '0')
+
+def dayslots2mask(dayslots, days=DAYS):
+    dayIndex = {day: d for d,day in enumerate(days)}
+    return indices2mask(dayIndex[day] * SLOTSPERDAY + slot for day,slots in dayslots.items() for slot in slots)
+
+def daytimes2mask(daytimes, days=DAYS):
+    return dayslots2mask({day: [time2slot(t) for t in times] for day,times in daytimes.items()}, days)
+
+'''
+Inverse of dayslots2mask: returns a dictionary from every day to the (sorted) list of slots
+  that are set in mask
 '''
+def mask2dayslots(mask, days=DAYS):
+    bits = maskBits(mask, len(days) * SLOTSPERDAY)
+    dayslots = {}
+    for d,day in enumerate(days):
+        offset = d * SLOTSPERDAY
+        dayslots[day] = [slot for slot in range(SLOTSPERDAY) if bits[offset + slot] == '1']
+    return dayslots
+
+def mask2daytimes(mask, days=DAYS):
+    return {day: [slot2time(slot) for slot in slots] for day,slots in mask2dayslots(mask, days).items()}
+
+def maskIndices(mask):
+    bits = maskBits(mask)
+    indices = []
+    index = bits.find('1')
+    while index >= 0:
+        indices.append(index)
+        index = bits.find('1', index + 1)
+    return indices
+
+def popcount(mask):
+    return bin(mask).count('1')
+
 def parseWhen2Meet(url, participants, myAvailability):
-    r = Request(url)
-    html = urlopen(r).read().decode()
-
-    slot_info = re.findall(r'ShowSlot\(([0-9]+),"([a-zA-Z]+) (\d\d:\d\d):\d\d (AM|PM)"\);', html)
-    id2slot = {s[0] : {'day' : s[1], 'time': s[2]+' '+s[3], 'available': []} for s in slot_info}
-    slot_index_info = re.findall(r'TimeOfSlot\[(\d+)\]=(\d+);', html)
-    slots = [None] * len(slot_index_info)
-    for idx,Id in slot_index_info:
-        slots[int(idx)] = id2slot[Id]
-
-    # Build reverse index of people names to people ids/keys
-    people = loadPeople()
-    name2pid = {p['name'] : pid for pid,p in people.items()}
-
-    people_name_info = re.findall(r"PeopleNames\[(\d+)\] = '([^;]+)';", html)
-    if len(people_name_info) > 0:
-        people_id_info = re.findall(r"PeopleIDs\[(\d+)\] = (\d+);", html)
-        idx2name = {p[0] : p[1] for p in people_name_info}
-        idx2id = {p[0] : p[1] for p in people_id_info}
-        id2personname = {idx2id[idx] : name for idx,name in idx2name.items()}
-        
-        availability_info = re.findall(r"AvailableAtSlot\[(\d+)\].push\((\d+)\);", html)
-        for slotidx,personid in availability_info:
-            personName = id2personname[personid]
-            pid = getPersonFromName(personName, participants)
-            slots[int(slotidx)]['available'].append(pid)
-
-    # Restructure by day
-    ret = {day : [] for day in DAYS}
-    for slot in slots:
-        ret[slot['day']].append({
-            'time': datetime.strptime(slot['time'], "%I:%M %p"),
-            'available': slot['available']
-        })
+    return parseWhen2MeetHTML(httpGet(url), participants, myAvailability)
+
+WHEN2MEETTOKENS = re.compile(
+    r'ShowSlot\((?P<slotId>\d+),"(?P<day>[^"]*?) ?(?P<time>\d\d:\d\d):\d\d (?P<ampm>AM|PM)[^"]*"\);'
+    r'|TimeOfSlot\[(?P<slotIdx>\d+)\]=(?P<timeOfSlot>\d+);'
+    r"|PeopleNames\[(?P<nameIdx>\d+)\] = '(?P<name>[^;]+)';"
+    r'|PeopleIDs\[(?P<idIdx>\d+)\] = (?P<personId>\d+);'
+    r'|AvailableAtSlot\[(?P<availIdx>\d+)\].push\((?P<availId>\d+)\);')
+# Longest token we expect to see; anything shorter than this at the end of a chunk is carried over
+#  to the next chunk in case it is the start of a token
+MAXTOKENLENGTH = 4096
+PARSECHUNKSIZE = 1 << 16
+
+# Formats of the dates in the slots of a when2meet over specific dates (rather than days of the week)
+WHEN2MEETDATEFORMATS = ['%a %b %d %Y', '%A %B %d %Y', '%b %d %Y', '%Y-%m-%d', '%m/%d/%Y']
 
-    # Sort and merge 15 min slots into half hour ones
-    for day in ret.keys():
-        slots = sorted(ret[day], key=lambda slot: slot['time'])
-        mergedSlots = []
-        for i in range(0, len(slots), 2):
-            mergedSlots.append({
-                'time': datetime.strftime(slots[i]['time'], "%I:%M %p"),
-                'available': list(set(slots[i]['available']).intersection(set(slots[i+1]['available'])))
-            })
-        ret[day] = mergedSlots
-
-    # Remove slots that I'm not available for
-    for day in ret.keys():
-        ret[day] = [slot for slot in ret[day] if slot['time'] in myAvailability[day]]
-    
+'''
+Returns:
+ - The day of the week or the date ("YYYY-MM-DD") of a when2meet slot, from the text of its ShowSlot
+'''
+def when2MeetDay(text):
+    text = text.strip()
+    if text in DAYS:
+        return text
+    for fmt in WHEN2MEETDATEFORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            pass
+    return text
+
+def chunksOf(page):
+    if isinstance(page, str):
+        page = page.encode()
+    page = memoryview(page)
+    for i in range(0, len(page), PARSECHUNKSIZE):
+        yield page[i:i+PARSECHUNKSIZE]
+
+'''
+Parses a when2meet page (str, bytes, or an iterable of byte chunks) in a single pass.
+Returns:
+ - Dictionary with the following fields:
+   - 'slots': bitmask of half-hour slots covered by the when2meet (and by my availability), over the
+     days of myAvailability (see roundDays); slots on any other day are ignored
+   - 'available': dictionary from person ID to bitmask of the slots in which that person is available
+   - 'ambiguousNames': dictionary from names that matched more than one participant to the IDs of
+     those participants (omitted if there are none)
+'''
+def parseWhen2MeetHTML(page, participants, myAvailability):
+    if isinstance(page, (str, bytes)):
+        page = chunksOf(page)
+    id2slot = {}        # when2meet slot ID -> (half-hour slot index, which 15 min half of it)
+    idx2slotId = {}     # when2meet slot number -> when2meet slot ID
+    idx2name = {}
+    idx2personId = {}
+    personId2idxs = {}  # when2meet person ID -> list of when2meet slot numbers they are available at
+    dayIndex = {day: d for d,day in enumerate(roundDays(myAvailability))}
+    dayTexts = {}       # text of the day in a ShowSlot -> index of that day, if it is in this round
+
+    with timedPhase('parse.tokenize'):
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        text = ''
+        for chunk in itertools.chain(page, [None]):
+            final = chunk is None
+            text += decoder.decode(b'' if final else bytes(chunk), final)
+            end = 0
+            for match in WHEN2MEETTOKENS.finditer(text):
+                token = match.lastgroup
+                if token == 'availId':
+                    personId = match.group('availId')
+                    personId2idxs.setdefault(personId, []).append(int(match.group('availIdx')))
+                elif token == 'timeOfSlot':
+                    idx2slotId[int(match.group('slotIdx'))] = match.group('timeOfSlot')
+                elif token == 'ampm':
+                    day = match.group('day')
+                    if not (day in dayTexts):
+                        dayTexts[day] = dayIndex.get(when2MeetDay(day))
+                    if dayTexts[day] is not None:
+                        minutes = time2minutes(match.group('time') + ' ' + match.group('ampm'))
+                        index = dayTexts[day] * SLOTSPERDAY + minutes // 30
+                        id2slot[match.group('slotId')] = (index, (minutes % 30) // 15)
+                elif token == 'name':
+                    idx2name[match.group('nameIdx')] = match.group('name')
+                elif token == 'personId':
+                    idx2personId[match.group('idIdx')] = match.group('personId')
+                end = match.end()
+            text = '' if final else text[max(end, len(text) - MAXTOKENLENGTH):]
+    countMetric('slotsParsed', len(idx2slotId))
+
+    # when2meet uses 15 min slots; we track both halves of each half hour slot separately and
+    #  then intersect them
+    idx2slot = {idx: id2slot[Id] for idx,Id in idx2slotId.items() if Id in id2slot}
+    halves = [indices2mask(index for index,h in idx2slot.values() if h == half) for half in (0, 1)]
+    allSlots = halves[0] & halves[1] & dayslots2mask(myAvailability, roundDays(myAvailability))
+
+    with timedPhase('parse.resolveNames'):
+        # Each when2meet person is matched to a participant once, using an index built for this page
+        id2personname = {idx2personId[idx]: name for idx,name in idx2name.items() if idx in idx2personId}
+        nameIndex = buildNameIndex(participants)
+        ambiguousNames = {}
+        personHalves = {}
+        for personId,idxs in personId2idxs.items():
+            if not (personId in id2personname):
+                continue
+            pid, matches = resolveName(id2personname[personId], nameIndex)
+            if len(matches) > 1:
+                ambiguousNames[id2personname[personId]] = matches
+            if not (pid in personHalves):
+                personHalves[pid] = ([], [])
+            for idx in idxs:
+                if idx in idx2slot:
+                    index,half = idx2slot[idx]
+                    personHalves[pid][half].append(index)
+    available = {}
+    for pid,(h0,h1) in personHalves.items():
+        mask = indices2mask(h0) & indices2mask(h1) & allSlots
+        if mask:
+            available[pid] = mask
+
+    ret = {'slots': allSlots, 'available': available}
+    if len(ambiguousNames) > 0:
+        ret['ambiguousNames'] = ambiguousNames
     return ret
 
 def respondents(when2meet):
-    res = set([])
-    for slots in when2meet.values():
-        for slot in slots:
-            for person in slot['available']:
-                res.add(person)
-    return list(res)
- 
+    return [pid for pid,mask in when2meet['available'].items() if mask]
+
+'''
+Returns:
+ - Bitmask of slots in which everyone is available
+'''
 def viableSlots(when2meet, everyone=None):
     if everyone is None:
         everyone = respondents(when2meet)
-    everyone = set(everyone)
-    viable = {day: [] for day in DAYS}
     if len(everyone) == 0:
-        return viable
-    for day,slots in when2meet.items():
-        for slot in slots:
-            if everyone.issubset(set(slot['available'])):
-                viable[day].append(slot)
+        return 0
+    viable = when2meet['slots']
+    for person in set(everyone):
+        viable &= when2meet['available'].get(person, 0)
     return viable
 
+'''
+Counts, for every slot, how many of the given people are available, using bit-sliced addition.
+Returns:
+ - List of bitmasks, where bit s of entry k is bit k of the count for slot s
+'''
+def availabilityCounts(when2meet, everyone):
+    counts = []
+    for person in set(everyone):
+        carry = when2meet['available'].get(person, 0) & when2meet['slots']
+        k = 0
+        while carry:
+            if k == len(counts):
+                counts.append(0)
+            counts[k], carry = counts[k] ^ carry, counts[k] & carry
+            k += 1
+    return counts
+
+'''
+Returns:
+ - Bitmask of slots in which the largest number of people are available
+'''
 def slotsWithMostAvailable(when2meet, everyone):
     if everyone is None:
         everyone = respondents(when2meet)
-    biggestSlotN = 0
-    for _,slots in when2meet.items():
-        for slot in slots:
-            available = set(slot['available']).intersection(everyone)
-            biggestSlotN = max(biggestSlotN, len(available))
-    viable = {day: [] for day in DAYS}
-    for day,slots in when2meet.items():
-        for slot in slots:
-            available = set(slot['available']).intersection(everyone)
-            if len(available) == biggestSlotN:
-                viable[day].append(slot)
-    return viable
+    counts = availabilityCounts(when2meet, everyone)
+    # Walk down from the most significant bit of the counts, keeping only those slots that
+    #  have that bit set (whenever any do)
+    best = when2meet['slots']
+    for plane in reversed(counts):
+        if best & plane:
+            best &= plane
+    return best
+
+'''
+Returns:
+ - Bitmask of slots at which a meeting nslots long can start, given the bitmask of slots in which
+   it can take place
+'''
+def meetingStarts(mask, nslots):
+    starts = mask
+    for k in range(1, nslots):
+        starts &= mask >> k
+    # Meetings cannot run past the end of a day
+    ndays = -(-mask.bit_length() // SLOTSPERDAY)
+    dayStarts = (1 << max(SLOTSPERDAY - nslots + 1, 0)) - 1
+    startsMask = int.from_bytes(dayStarts.to_bytes(SLOTSPERDAY // 8, 'little') * ndays, 'little')
+    return starts & startsMask
 
 def numViableMeetingTimes(when2meet, meetingLength, everyone=None):
-    when2meet = viableSlots(when2meet, everyone)
-    # when2meet = slotsWithMostAvailable(when2meet, everyone)
-    nslots = int(meetingLength / 30);
-    nViable = 0
-    for slots in when2meet.values():
-        # For each valid slot, check whether there are enough back-to-back slots
-        #  starting from that slot to account for the whole meeting length
-        for i in range(0, len(slots)-(nslots-1)):
-            time = datetime.strptime(slots[i]['time'], "%I:%M %p")
-            enoughValidBackToBackSlots = True
-            for j in range(1, nslots):
-                time2 = datetime.strptime(slots[i+j]['time'], "%I:%M %p")
-                if time2 - time != THIRTYMINS:
-                    enoughValidBackToBackSlots = False
-                    break
-                time = time2
-            if enoughValidBackToBackSlots:
-                nViable += 1
-    return nViable
+    viable = viableSlots(when2meet, everyone)
+    # viable = slotsWithMostAvailable(when2meet, everyone)
+    nslots = int(meetingLength / 30)
+    return popcount(meetingStarts(viable, nslots))
+
+'''
+Finds the viable start times of every meeting in a batch at once, and how much the meetings compete
+  with each other for them. With NumPy, this builds a single meetings x people x slots boolean array,
+  reduces it over people, and finds the start times with a sliding window sum over each meeting's
+  length; without NumPy, the same is done with one bitmask per meeting.
+Arguments:
+ - when2meets: List of availability (see parseWhen2MeetHTML), one per meeting
+ - lengths: List of meeting lengths in minutes
+ - everyones: List of lists of the people who must be available for each meeting
+Returns:
+ - Contention matrix, as a list of lists where entry [i][j] is the number of viable start times
+   that meetings i and j share (so entry [i][i] is meeting i's number of viable meeting times)
+'''
+def batchViability(when2meets, lengths, everyones):
+    if np is None:
+        starts = [meetingStarts(viableSlots(w, everyone), int(length / 30))
+            for w,length,everyone in zip(when2meets, lengths, everyones)]
+        return [[popcount(a & b) for b in starts] for a in starts]
+
+    # Masks are converted to rows of the array all at once, from their bytes; people that a meeting
+    #  doesn't have are padded with all slots available, which leaves the reduction unchanged
+    ndays = max([-(-w['slots'].bit_length() // SLOTSPERDAY) for w in when2meets] + [1])
+    nslots = ndays * SLOTSPERDAY
+    nbytes = nslots // 8
+    def masks2array(masks, shape):
+        buffer = b''.join([mask.to_bytes(nbytes, 'little') for mask in masks])
+        bits = np.unpackbits(np.frombuffer(buffer, dtype=np.uint8).reshape(-1, nbytes), axis=1, bitorder='little')
+        return bits.astype(bool).reshape(*shape, nslots)
+    everyones = [sorted(set(everyone)) for everyone in everyones]
+    npeople = max([len(everyone) for everyone in everyones] + [1])
+    padding = (1 << nslots) - 1
+    masks = []
+    for w,everyone in zip(when2meets, everyones):
+        masks += [w['available'].get(person, 0) for person in everyone]
+        masks += [padding] * (npeople - len(everyone))
+    available = masks2array(masks, (len(when2meets), npeople))
+    allSlots = masks2array([w['slots'] for w in when2meets], (len(when2meets),))
+    anyone = np.array([len(everyone) > 0 for everyone in everyones], dtype=bool)
+    viable = available.all(axis=1) & allSlots & anyone[:, None]
+
+    # A meeting n slots long can start at slot s if slots s..s+n-1 are all viable and on the same day
+    n = np.array([int(length / 30) for length in lengths], dtype=np.int64)
+    cumulative = np.zeros((len(when2meets), nslots + 1), dtype=np.int64)
+    cumulative[:, 1:] = viable.cumsum(axis=1)
+    s = np.arange(nslots)
+    ends = np.minimum(s[None, :] + n[:, None], nslots)
+    windows = np.take_along_axis(cumulative, ends, axis=1) - cumulative[:, :-1]
+    starts = (windows == n[:, None]) & ((s % SLOTSPERDAY)[None, :] + n[:, None] <= SLOTSPERDAY)
+    starts = starts.astype(np.int64)
+    return (starts @ starts.T).tolist()
+
+# How many of the meetings that each meeting competes with most are reported
+CONTENTIONMEETINGS = 3
+
+'''
+Returns:
+ - Dictionary from meeting name to a list of [other meeting name, number of viable meeting times
+   the two meetings share], for the other meetings it shares the most viable times with, most first
+'''
+def meetingContention(names, contention):
+    ret = {}
+    for i,name in enumerate(names):
+        shared = [[names[j], contention[i][j]] for j in range(len(names)) if j != i and contention[i][j] > 0]
+        ret[name] = sorted(shared, key=lambda x: (-x[1], x[0]))[:CONTENTIONMEETINGS]
+    return ret
+
+'''
+Returns:
+ - Bitmask of the slots (out of the given slots) whose bit-sliced count (see availabilityCounts) is
+   exactly value
+'''
+def slotsWithCount(counts, value, slots):
+    mask = slots
+    for k in range(max(len(counts), value.bit_length())):
+        plane = counts[k] if k < len(counts) else 0
+        mask &= plane if (value >> k) & 1 else ~plane
+    return mask
+
+'''
+Counts how many viable meeting times there would be with each person (and optionally each pair of
+  people) left out of a meeting. Rather than recomputing viability for every subset, everyone's
+  availability is scanned once to find the slots at which exactly zero, one or two people are
+  missing; a slot is then viable without a set of people if everyone missing there is in the set.
+Returns:
+ - Dictionary from person ID to number of viable meeting times without that person
+ - If pairs is true, dictionary from (person ID, person ID) to number of viable meeting times
+   without both of them (otherwise None)
+'''
+def leaveOneOutViability(when2meet, meetingLength, everyone, pairs=False):
+    everyone = sorted(set(everyone))
+    n = len(everyone)
+    nslots = int(meetingLength / 30)
+    counts = availabilityCounts(when2meet, everyone)
+    missing0, missing1, missing2 = [slotsWithCount(counts, n - k, when2meet['slots']) if n >= k else 0 for k in range(3)]
+    avail = {person: when2meet['available'].get(person, 0) for person in everyone}
+    # With nobody left, no times are viable (as with numViableMeetingTimes)
+    without = {person: popcount(meetingStarts(missing0 | (missing1 & ~avail[person]), nslots)) if n > 1 else 0
+        for person in everyone}
+    if not pairs:
+        return without, None
+    withoutPairs = {}
+    for p,q in itertools.combinations(everyone, 2):
+        viable = missing0 | (missing1 & ~(avail[p] & avail[q])) | (missing2 & ~avail[p] & ~avail[q])
+        withoutPairs[(p, q)] = popcount(meetingStarts(viable, nslots)) if n > 2 else 0
+    return without, withoutPairs
+
+# How many of the best pairs of people to leave out are reported
+IMPACTPAIRS = 5
+
+'''
+Returns:
+ - The people (and, if the "impactAnalysis" config option is "pairs", the pairs of people) whose
+   removal from a meeting would increase its number of viable meeting times, as a dictionary with
+   the fields:
+   - 'people': List of [person ID, number of viable meeting times without them], best first
+   - 'pairs': List of [person ID, person ID, number of viable meeting times without them], best
+     first, for pairs that do better than leaving out either one of them alone
+ - None if the "impactAnalysis" config option is "none"
+'''
+def participantImpact(when2meet, meetingLength, everyone):
+    mode = loadConfig()['impactAnalysis']
+    assert mode in ['none', 'single', 'pairs'], f'Invalid "impactAnalysis" option "{mode}" (must be "none", "single", or "pairs")'
+    if mode == 'none':
+        return None
+    current = numViableMeetingTimes(when2meet, meetingLength, everyone)
+    without, withoutPairs = leaveOneOutViability(when2meet, meetingLength, everyone, mode == 'pairs')
+    impact = {'people': sorted([[p, n] for p,n in without.items() if n > current], key=lambda x: (-x[1], x[0]))}
+    if withoutPairs is not None:
+        impact['pairs'] = sorted([[p, q, n] for (p,q),n in withoutPairs.items() if n > max(without[p], without[q])],
+            key=lambda x: (-x[2], x[0], x[1]))[:IMPACTPAIRS]
+    return impact
+
+FILECACHESIZE = 64
+__fileCache = OrderedDict()
+__fileCacheLock = threading.Lock()
 
+'''
+Loads a file through a cache keyed on its path, modification time and size, so that a file is only
+  read (and validated/normalized) again once it has changed, and long-running loops pick up edits
+  to it the next time they load it. The least recently used files are evicted once the cache holds
+  more than FILECACHESIZE of them.
+Arguments:
+ - read: Function which reads, validates and normalizes the file, given its filename
+Returns:
+ - The value returned by read (the same object for as long as the file is unchanged)
+'''
+def loadCachedFile(filename, read):
+    filename = os.path.abspath(filename)
+    stat = os.stat(filename)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with __fileCacheLock:
+        entry = __fileCache.get(filename)
+        if entry is not None and entry[0] == version:
+            __fileCache.move_to_end(filename)
+            return entry[1]
+    value = read(filename)
+    with __fileCacheLock:
+        __fileCache[filename] = (version, value)
+        __fileCache.move_to_end(filename)
+        while len(__fileCache) > FILECACHESIZE:
+            __fileCache.popitem(last=False)
+    return value
+
+# Config and people directory set directly (e.g. by the benchmarks, or when they are shared with
+#  worker processes), which are used instead of config.json and people.json
 __config = None
+__people = None
+
 def loadConfig():
-    global __config
-    if __config is None:
-        dirPath = os.path.dirname(os.path.abspath(__file__))
-        filename = os.path.join(dirPath, 'config.json')
-        with open(filename) as f:
-            j = json.load(f)
-        assert 'name' in j, 'config.json missing "name"'
-        assert 'emailAddress' in j, 'config.json missing "emailAddress"'
-        assert 'emailServer' in j, 'config.json missing "emailServer"'
-        defaults = {
-            'timeZone' : 'America/New_York',
-            'deadlineInDaysFromNow': 7,
-            'reminderFrequencyInHours' : 24,
-            'progressCheckFrequencyInHours' : 1,
-            'useBestSlotsIfNoneViable': False
-        }
-        __config = {**defaults, **j}
-    return __config
+    if __config is not None:
+        return __config
+    dirPath = os.path.dirname(os.path.abspath(__file__))
+    return loadCachedFile(os.path.join(dirPath, 'config.json'), readConfigFile)
 
-__people = None
+'''
+Returns:
+ - Path to the people directory: people.json by default, or the file given by "peopleDirectory",
+   which may also be a SQLite database (.db) or a CSV file (.csv, see compilePeopleCSV)
+'''
+def peopleDirectoryFilename():
+    dirPath = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(dirPath, loadConfig()['peopleDirectory'] or 'people.json')
+
+'''
+Returns:
+ - The whole people directory, as a dictionary from person ID to {name:, email:}. For large
+   directories, lookupPeople (which only loads the people that are needed) should be used instead.
+'''
 def loadPeople():
-    global __people
-    if __people is None:
-        dirPath = os.path.dirname(os.path.abspath(__file__))
-        filename = os.path.join(dirPath, 'people.json')
-        with open(filename) as f:
-            j = json.load(f)
-        __people = j
-    return __people
+    if __people is not None:
+        return __people
+    filename = peopleDirectoryFilename()
+    if filename.endswith('.json'):
+        return loadCachedFile(filename, readPeopleFile)
+    return queryPeopleDirectory('SELECT id, name, email FROM people ORDER BY position')
+
+'''
+Returns:
+ - Dictionary from person ID to {name:, email:} for each of the people with the given IDs who are in
+   the people directory, in directory order. For a SQLite or CSV directory, only these people are
+   read from it.
+'''
+def lookupPeople(ids):
+    ids = set(ids)
+    if __people is not None or peopleDirectoryFilename().endswith('.json'):
+        return {pid: p for pid,p in loadPeople().items() if pid in ids}
+    people = []
+    ids = sorted(ids)
+    # Stay well under SQLite's limit on the number of parameters in a query
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i+500]
+        people += queryPeopleDirectory(f'SELECT id, name, email, position FROM people WHERE id IN ({",".join("?" * len(chunk))})', chunk).items()
+    people.sort(key=lambda item: item[1]['position'])
+    return {pid: {'name': p['name'], 'email': p['email']} for pid,p in people}
+
+PEOPLEDIRECTORYSCHEMA = '''CREATE TABLE people (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL
+)'''
+
+def queryPeopleDirectory(query, params=()):
+    filename = peopleDirectoryFilename()
+    if filename.endswith('.csv'):
+        filename = compilePeopleCSV(filename)
+    # The path is quoted into the URI, since it may contain characters (e.g. '?' or '#') that mean
+    #  something in a URI
+    db = sqlite3.connect(Path(filename).resolve().as_uri() + '?mode=ro', uri=True)
+    try:
+        db.row_factory = sqlite3.Row
+        rows = db.execute(query, params).fetchall()
+    finally:
+        db.close()
+    return {row['id']: {k: row[k] for k in row.keys() if k != 'id'} for row in rows}
+
+'''
+Compiles a CSV people directory (with "id", "name" and "email" columns) into a SQLite people
+  directory next to it, if it has not already been compiled since the CSV file last changed
+Returns:
+ - Path to the SQLite people directory
+'''
+def compilePeopleCSV(csvFilename):
+    dbFilename = os.path.splitext(csvFilename)[0] + '.people.db'
+    if os.path.exists(dbFilename) and os.path.getmtime(dbFilename) >= os.path.getmtime(csvFilename):
+        return dbFilename
+    tmpFilename = f'{dbFilename}.{os.getpid()}.tmp'
+    if os.path.exists(tmpFilename):
+        os.remove(tmpFilename)
+    db = sqlite3.connect(tmpFilename)
+    try:
+        db.execute(PEOPLEDIRECTORYSCHEMA)
+        with open(csvFilename, newline='') as f:
+            reader = csv.DictReader(f)
+            missing = set(['id', 'name', 'email']).difference(reader.fieldnames or [])
+            assert len(missing) == 0, f'{csvFilename} is missing the columns {sorted(missing)}'
+            db.executemany('INSERT OR REPLACE INTO people VALUES (?, ?, ?, ?)',
+                ((row['id'].strip(), i, row['name'].strip(), row['email'].strip()) for i,row in enumerate(reader)))
+        db.commit()
+    finally:
+        db.close()
+    os.replace(tmpFilename, dbFilename)
+    return dbFilename
+
+def readConfigFile(filename):
+    with open(filename) as f:
+        j = json.load(f)
+    assert 'name' in j, 'config.json missing "name"'
+    assert 'emailAddress' in j, 'config.json missing "emailAddress"'
+    assert 'emailServer' in j, 'config.json missing "emailServer"'
+    defaults = {
+        'timeZone' : 'America/New_York',
+        'deadlineInDaysFromNow': 7,
+        'reminderFrequencyInHours' : 24,
+        'progressCheckFrequencyInHours' : 1,
+        'activeProgressCheckFrequencyInHours': 0.25,
+        'maxProgressCheckFrequencyInHours': 12,
+        'useBestSlotsIfNoneViable': False,
+        'fetchConcurrency': 8,
+        'fetchRetries': 3,
+        'emailPort': 465,
+        'emailUseSSL': True,
+        'emailConnections': 3,
+        'emailsPerSecond': 2,
+        'emailRetries': 3,
+        'progressStore': 'json',
+        'when2meetServer': 'https://when2meet.com',
+        'metricsLog': None,
+        'metricsPrometheusFile': None,
+        'impactAnalysis': 'single',
+        'reminderDigest': False,
+        'peopleDirectory': None
+    }
+    return {**defaults, **j}
+
+def readPeopleFile(filename):
+    with open(filename) as f:
+        return json.load(f)
+
+'''
+Builds an index from the forms of name that getPersonFromName matches against to the IDs of the
+  participants with that name (in people.json order)
+'''
+def buildNameIndex(participants):
+    index = {'full': {}, 'first': {}, 'firstLastInitial': {}, 'firstLastInitialNoSpace': {}}
+    for pid,p in lookupPeople(participants).items():
+        name = p['name'].lower()
+        parts = name.split(' ')
+        index['full'].setdefault(name, []).append(pid)
+        index['first'].setdefault(parts[0], []).append(pid)
+        if len(parts) > 1 and len(parts[1]) > 0:
+            index['firstLastInitial'].setdefault(parts[0] + ' ' + parts[1][0], []).append(pid)
+            index['firstLastInitialNoSpace'].setdefault(parts[0] + parts[1][0], []).append(pid)
+    return index
 
 '''
 Tries to match against several forms of name:
@@ -195,120 +938,499 @@ Tries to match against several forms of name:
 - First name + last initial (with space)
 - First name + last initial (no space)
 If all fail, returns UnknownPerson<Name>
+Returns:
+ - ID of the matching person
+ - List of IDs of all people who match equally well (more than one if the name is ambiguous)
 '''
-def getPersonFromName(name, participants):
-    people = loadPeople()
+def resolveName(name, index):
     origName = name
     name = name.lower().strip()
-    # Try full name
-    exactMatch = next((pid for pid,p in people.items() if (p['name'].lower() == name and pid in participants)), None)
-    if not (exactMatch is None):
-        return exactMatch
-    # Try first name
-    firstname = name.split(' ')[0]
-    firstMatch = next((pid for pid,p in people.items() if (p['name'].split(' ')[0].lower() == firstname) and pid in participants), None)
-    if not (firstMatch is None):
-        return firstMatch
-    # Try first name + last initial (with space)
-    if len(name.split(' ')) == 2:
-        lastInitial = name.split(' ')[1][0]
-        firstLastMatch = next((pid for pid,p in people.items() if (p['name'].split(' ')[0].lower() == firstname and p['name'].split(' ')[1][0].lower() == lastInitial) and pid in participants), None)
-        if not (firstLastMatch is None):
-            return firstLastMatch
-    # Try first name + last initial (no space)
-    if len(name.split(' ')) == 1:
-        firstLastMatch = next((pid for pid,p in people.items() if (p['name'].split(' ')[0].lower() + p['name'].split(' ')[1][0].lower() == name) and pid in participants), None)
-        if not (firstLastMatch is None):
-            return firstLastMatch
-    return f'UnknownPerson<{origName}>'
-
-__inputFiles = {}
+    parts = name.split(' ')
+    keys = [('full', name), ('first', parts[0])]
+    if len(parts) == 2 and len(parts[1]) > 0:
+        keys.append(('firstLastInitial', parts[0] + ' ' + parts[1][0]))
+    if len(parts) == 1:
+        keys.append(('firstLastInitialNoSpace', name))
+    for form,key in keys:
+        matches = index[form].get(key, [])
+        if len(matches) > 0:
+            return matches[0], matches
+    unknown = f'UnknownPerson<{origName}>'
+    return unknown, [unknown]
+
+def getPersonFromName(name, participants, index=None):
+    if index is None:
+        index = buildNameIndex(participants)
+    return resolveName(name, index)[0]
+
+'''
+Merges overlapping (or touching) intervals.
+Arguments:
+ - intervals: List of (start, end, label) tuples
+Returns:
+ - Sorted list of (start, end, labels) tuples, where labels lists the labels (in order, without
+   duplicates or None) of the intervals that were merged into each one
+'''
+def mergeIntervals(intervals):
+    merged = []
+    for start,end,label in sorted(intervals, key=lambda i: (i[0], i[1])):
+        if len(merged) > 0 and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end, []])
+        if label is not None and not (label in merged[-1][2]):
+            merged[-1][2].append(label)
+    return [tuple(m) for m in merged]
+
+'''
+Returns:
+ - The sorted slots that are not covered by any of a sorted list of non-overlapping intervals (see
+   mergeIntervals) of slots
+'''
+def subtractIntervals(slots, intervals):
+    starts = [start for start,end,labels in intervals]
+    free = []
+    for slot in slots:
+        i = bisect.bisect_right(starts, slot) - 1
+        if i < 0 or slot >= intervals[i][1]:
+            free.append(slot)
+    return free
+
+ICSNAMEREGEX = re.compile(r'[^;:]*')
+ICSPROPERTIES = ['UID', 'SUMMARY', 'DTSTART', 'DTEND', 'DURATION', 'RRULE', 'EXDATE', 'RECURRENCE-ID', 'STATUS', 'TRANSP']
+
+'''
+Reads the events from an iCalendar (.ics) file one at a time, without loading the whole file.
+Returns:
+ - Generator of dictionaries from property name (only those in ICSPROPERTIES) to a list of
+   (parameters, value) pairs, one per occurrence of the property in the event
+'''
+def iterCalendarEvents(filename):
+    def parseParams(line, name):
+        # e.g. DTSTART;TZID=America/New_York:20220103T090000
+        colon = line.find(':')
+        # Parameter values may be quoted, and may then contain colons
+        if '"' in line[:colon]:
+            quoted = False
+            for colon,c in enumerate(line):
+                if c == '"':
+                    quoted = not quoted
+                elif c == ':' and not quoted:
+                    break
+        params = line[len(name)+1:colon].split(';') if line[len(name)] == ';' else []
+        return dict(p.partition('=')[::2] for p in params), line[colon+1:]
+
+    event = None
+    depth = 0
+    def handle(line):
+        nonlocal event, depth
+        name = ICSNAMEREGEX.match(line).group(0).upper()
+        if name == 'BEGIN':
+            if event is not None:
+                depth += 1
+            elif line[6:].strip().upper() == 'VEVENT':
+                event = {}
+        elif name == 'END':
+            if depth > 0:
+                depth -= 1
+            elif event is not None and line[4:].strip().upper() == 'VEVENT':
+                finished, event = event, None
+                return finished
+        elif event is not None and depth == 0 and name in ICSPROPERTIES and len(line) > len(name):
+            event.setdefault(name, []).append(parseParams(line, name))
+        return None
+
+    # Long lines are "folded" onto continuation lines that start with a space or tab
+    line = None
+    with open(filename, encoding='utf-8', errors='replace') as f:
+        for raw in f:
+            raw = raw.rstrip('\r\n')
+            if raw[:1] in (' ', '\t') and line is not None:
+                line += raw[1:]
+                continue
+            if line is not None:
+                finished = handle(line)
+                if finished is not None:
+                    yield finished
+            line = raw
+    if line is not None:
+        finished = handle(line)
+        if finished is not None:
+            yield finished
+
+'''
+Returns:
+ - An iCalendar DATE or DATE-TIME value as a datetime that is aware of its time zone (UTC for values
+   ending in Z, the zone given by its TZID parameter, or else defaultZone), or None for a DATE
+'''
+def parseICSDateTime(params, value, defaultZone):
+    value = value.strip()
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        return None
+    zone = defaultZone
+    if value.endswith('Z'):
+        zone = timezone.utc
+    elif 'TZID' in params:
+        try:
+            zone = ZoneInfo(params['TZID'].strip('"'))
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    # (Much faster than strptime, which matters for calendars with many thousands of events)
+    return datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]), int(value[9:11]), int(value[11:13]),
+        int(value[13:15]), tzinfo=zone)
+
+ICSDURATIONREGEX = re.compile(r'([+-]?)P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+
+def parseICSDuration(value):
+    match = ICSDURATIONREGEX.match(value.strip())
+    if not match:
+        raise ValueError(f'Invalid iCalendar duration "{value}"')
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    duration = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+        minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -duration if sign == '-' else duration
+
+ICSWEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+
+'''
+Returns:
+ - The days of a month picked out by a recurrence rule's BYMONTHDAY/BYDAY parts (or the day of the
+   month of the first occurrence, if it has neither)
+'''
+def recurrenceMonthDays(year, month, rule, firstDay):
+    ndays = (date(year + month // 12, month % 12 + 1, 1) - date(year, month, 1)).days
+    days = []
+    if 'BYMONTHDAY' in rule:
+        for d in rule['BYMONTHDAY'].split(','):
+            d = int(d)
+            days.append(d if d > 0 else ndays + d + 1)
+    elif 'BYDAY' in rule:
+        for byday in rule['BYDAY'].split(','):
+            weekday = ICSWEEKDAYS.index(byday[-2:])
+            matching = [d for d in range(1, ndays + 1) if date(year, month, d).weekday() == weekday]
+            if len(byday) > 2:
+                n = int(byday[:-2])
+                matching = [matching[n - 1 if n > 0 else n]] if abs(n) <= len(matching) and n != 0 else []
+            days += matching
+    else:
+        days.append(firstDay)
+    return sorted(set(d for d in days if 1 <= d <= ndays))
+
+# (A backstop against rules whose periods never reach the end of the window)
+MAXRECURRENCEPERIODS = 100000
+
+'''
+Expands a recurring event's recurrence rule (RRULE), only as far as needed to find the occurrences
+  that start before windowEnd. The DAILY, WEEKLY, MONTHLY and YEARLY frequencies are supported, with
+  the INTERVAL, COUNT, UNTIL, BYDAY, BYMONTHDAY and BYMONTH parts; other parts are ignored.
+Returns:
+ - Generator of the start times of the occurrences (including the first one, start) that may
+   overlap the window starting at windowStart, given that each occurrence lasts for duration
+'''
+def expandRecurrence(start, rrule, duration, windowStart, windowEnd):
+    rule = dict(part.partition('=')[::2] for part in rrule.upper().split(';') if part)
+    freq = rule.get('FREQ')
+    interval = int(rule.get('INTERVAL', 1))
+    if interval < 1:
+        raise ValueError(f'Invalid recurrence interval {interval}')
+    count = int(rule['COUNT']) if 'COUNT' in rule else None
+    until = None
+    if 'UNTIL' in rule:
+        until = parseICSDateTime({}, rule['UNTIL'], start.tzinfo)
+        if until is None:
+            until = datetime.strptime(rule['UNTIL'][:8], '%Y%m%d').replace(hour=23, minute=59, second=59, tzinfo=start.tzinfo)
+
+    def periodStarts(period):
+        if freq == 'DAILY':
+            day = start + timedelta(days=period * interval)
+            return [day] if not ('BYDAY' in rule) or ICSWEEKDAYS[day.weekday()] in rule['BYDAY'] else []
+        if freq == 'WEEKLY':
+            weekStart = start - timedelta(days=start.weekday()) + timedelta(weeks=period * interval)
+            weekdays = [ICSWEEKDAYS.index(d[-2:]) for d in rule['BYDAY'].split(',')] if 'BYDAY' in rule else [start.weekday()]
+            return [weekStart + timedelta(days=d) for d in sorted(set(weekdays))]
+        if freq == 'MONTHLY' or freq == 'YEARLY':
+            if freq == 'MONTHLY':
+                months = start.month - 1 + period * interval
+                yearMonths = [(start.year + months // 12, months % 12 + 1)]
+            else:
+                byMonth = [int(m) for m in rule['BYMONTH'].split(',')] if 'BYMONTH' in rule else [start.month]
+                yearMonths = [(start.year + period * interval, m) for m in sorted(byMonth)]
+            return [start.replace(year=y, month=m, day=d) for y,m in yearMonths for d in recurrenceMonthDays(y, m, rule, start.day)]
+        return [start] if period == 0 else None
+
+    # The time at which a period begins; no occurrence in it can be earlier
+    def periodBegins(period):
+        if freq == 'DAILY':
+            return start + timedelta(days=period * interval)
+        if freq == 'WEEKLY':
+            return start - timedelta(days=start.weekday()) + timedelta(weeks=period * interval)
+        if freq == 'MONTHLY':
+            months = start.month - 1 + period * interval
+            return start.replace(year=start.year + months // 12, month=months % 12 + 1, day=1)
+        if freq == 'YEARLY':
+            return start.replace(year=start.year + period * interval, month=1, day=1)
+        return start
+
+    # Without a COUNT, skip straight to the periods around the window (which may be years after
+    #  the first occurrence)
+    period = 0
+    if count is None:
+        behind = (windowStart - duration - start).days
+        # (Using the longest possible month and year, so as not to skip too far)
+        periodDays = {'DAILY': 1, 'WEEKLY': 7, 'MONTHLY': 31, 'YEARLY': 366}.get(freq, 1) * interval
+        period = max(0, behind // periodDays - 1)
+    seen = 0
+    for period in range(period, period + MAXRECURRENCEPERIODS):
+        # Stop once a whole period is past the window, even if no occurrence has been (e.g. for a
+        #  rule such as BYMONTH=2;BYMONTHDAY=30, which never produces one)
+        begins = periodBegins(period)
+        if (until is not None and begins > until) or begins >= windowEnd:
+            return
+        starts = periodStarts(period)
+        if starts is None:
+            return
+        for occurrence in starts:
+            if occurrence < start:
+                continue
+            if (until is not None and occurrence > until) or occurrence >= windowEnd:
+                return
+            seen += 1
+            if count is not None and seen > count:
+                return
+            if occurrence + duration > windowStart:
+                yield occurrence
+
+'''
+Imports the times at which the user is busy on the given dates from an iCalendar file (e.g. one
+  exported from Google Calendar or Outlook), reading it one event at a time.
+Recurring events are expanded only between the first and last of those dates. Cancelled events,
+  events marked as free (TRANSP:TRANSPARENT), all-day events and events that can't be parsed are
+  skipped.
+Arguments:
+ - dates: Sorted list of dates
+ - timeZone: Time zone in which the busy times are expressed (that of the when2meets)
+Returns:
+ - List of the busy times on each date, as merged intervals of slots (see mergeIntervals) labeled
+   with the names of the events
+'''
+def calendarBusyIntervals(filename, dates, timeZone):
+    zone = ZoneInfo(timeZone)
+    dayStarts = [datetime(d.year, d.month, d.day, tzinfo=zone) for d in dates]
+    weekStart = dayStarts[0]
+    weekEnd = dayStarts[-1] + timedelta(days=1)
+
+    occurrences = []
+    overridden = set()
+    for event in iterCalendarEvents(filename):
+        prop = lambda name: event[name][0] if name in event else ({}, '')
+        if prop('STATUS')[1].strip().upper() == 'CANCELLED' or prop('TRANSP')[1].strip().upper() == 'TRANSPARENT':
+            continue
+        if not ('DTSTART' in event):
+            continue
+        # Events with values that can't be parsed (e.g. a malformed DURATION or RRULE) are skipped
+        try:
+            start = parseICSDateTime(*prop('DTSTART'), zone)
+            if start is None:
+                continue
+            if 'DTEND' in event:
+                end = parseICSDateTime(*prop('DTEND'), zone)
+                duration = end - start if end is not None else timedelta(0)
+            elif 'DURATION' in event:
+                duration = parseICSDuration(prop('DURATION')[1])
+            else:
+                duration = timedelta(0)
+            if duration <= timedelta(0):
+                continue
+            uid = prop('UID')[1]
+            summary = prop('SUMMARY')[1].replace('\\,', ',').replace('\\;', ';') or 'Busy'
+            if 'RECURRENCE-ID' in event:
+                # This replaces one occurrence of a recurring event
+                originalStart = parseICSDateTime(*prop('RECURRENCE-ID'), zone)
+                if originalStart is not None:
+                    overridden.add((uid, originalStart))
+            if 'RRULE' in event and not ('RECURRENCE-ID' in event):
+                excluded = set(parseICSDateTime(params, v, zone) for params,value in event.get('EXDATE', []) for v in value.split(','))
+                starts = [s for s in expandRecurrence(start, prop('RRULE')[1], duration, weekStart, weekEnd) if not (s in excluded)]
+                occurrences += [(uid, s, s, duration, summary) for s in starts]
+            elif start < weekEnd and start + duration > weekStart:
+                occurrences.append((None if 'RECURRENCE-ID' in event else uid, start, start, duration, summary))
+        except (ValueError, OverflowError):
+            continue
+
+    busy = [[] for d in dates]
+    for uid,originalStart,start,duration,summary in occurrences:
+        if uid is not None and (uid, originalStart) in overridden:
+            continue
+        start = start.astimezone(zone)
+        end = start + duration
+        # Only the dates that the occurrence overlaps are visited
+        d = max(bisect.bisect_right(dayStarts, start) - 1, 0)
+        while d < len(dates) and dayStarts[d] < end:
+            dayStart = dayStarts[d]
+            dayEnd = dayStart + timedelta(days=1)
+            if start < dayEnd:
+                startMinutes = (max(start, dayStart) - dayStart).total_seconds() / 60
+                endMinutes = (min(end, dayEnd) - dayStart).total_seconds() / 60
+                busy[d].append((int(startMinutes // 30), -int(-endMinutes // 30), summary))
+            d += 1
+    return [mergeIntervals(intervals) for intervals in busy]
+
 def loadInputFile(filename):
-    global __inputFiles
-    if not filename in __inputFiles:
-        with open(filename) as f:
-            j = json.load(f)
-        
-        assert 'myAvailability' in  j, 'Input file did not provide "myAvailability"'
-        defaultAvailability = {day : [] for day in
-            ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']}
-        j['myAvailability'] = {**defaultAvailability, **j['myAvailability']}
-        j['myAvailability'] = {day: ranges2slots(ranges) for day,ranges in j['myAvailability'].items()}
-
-        defaultCommitments = {day : [] for day in
-            ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']}
-        j['myCommitments'] = {**defaultCommitments, **j['myCommitments']}
-        for day,commitments in j['myCommitments'].items():
-            for commitment in commitments:
-                # Remove any slots from myAvailability that conflict with this commitment
-                t = datetime.strptime(commitment['time'], "%I:%M %p")
-                nslots = int(commitment['length'] / 30)
-                for i in range(0, nslots):
-                    tstr = datetime.strftime(t, "%I:%M %p")
-                    if tstr in j['myAvailability'][day]:
-                        j['myAvailability'][day].remove(tstr)
-                    t = t + THIRTYMINS    
-
-        myPhysicalLocation = j['myLocations']['physical'] if ('myLocations' in j) and ('physical' in j['myLocations']) else None
-        myRemoteLocation = j['myLocations']['remote'] if ('myLocations' in j) and ('remote' in j['myLocations']) else None
-
-        assert 'meetingsToSchedule' in  j, 'Input file did not provide any "meetingsToSchedule"'
-        meetings = j['meetingsToSchedule']
-        meetingDefaults = {
-            'length': 60,
-            'type': 'hybrid'
-        }
-        if myPhysicalLocation is not None:
-            meetingDefaults['physicalLocation'] = myPhysicalLocation
-        if myRemoteLocation is not None:
-            meetingDefaults['remoteLocation'] = myRemoteLocation
-        for i in range(len(meetings)):
-            meetings[i] = {**meetingDefaults, **meetings[i]}
-            assert 'name' in meetings[i], f'Meeting {i} has no "name"'
-            name = meetings[i]['name']
-            assert meetings[i]['length'] % 30 == 0, f'Length of meeting "{name}" is not a multiple of 30 (minutes)'
-            assert 'participants' in meetings[i], f'Meeting "{name}" has no "participants"'
-            mtype = meetings[i]['type']
-            if mtype == 'hybrid' or mtype == 'in-person':
-                assert 'physicalLocation' in meetings[i], 'Meeting "{name}" has no "physicalLocation"'
-            if mtype == 'hybrid' or mtype == 'remote':
-                assert 'remoteLocation' in meetings[i], 'Meeting "{name}" has no "remoteLocation"'
-            if mtype == 'in-person':
-                meetings[i].pop('remoteLocation', None)
-            if mtype == 'remote':
-                meetings[i].pop('physicalLocation', None)
-        
-        __inputFiles[filename] = j
+    return loadCachedFile(filename, readInputFile)
+
+def readInputFile(filename):
+    with open(filename) as f:
+        j = json.load(f)
     
-    return __inputFiles[filename]
+    assert 'myAvailability' in  j, 'Input file did not provide "myAvailability"'
+    for day in list(j['myAvailability']) + list(j.get('myCommitments', {})):
+        assert day in DAYS or isDate(day), f'"{day}" is neither a day of the week nor a date (YYYY-MM-DD)'
+    if 'dateRange' in j:
+        first, last = [date.fromisoformat(d) for d in j['dateRange']]
+        assert first <= last, '"dateRange" ends before it starts'
+        days = [(first + timedelta(days=i)).isoformat() for i in range((last - first).days + 1)]
+    elif any(isDate(day) for day in j['myAvailability']):
+        days = sorted(day for day in j['myAvailability'] if isDate(day))
+    else:
+        days = DAYS
+    # When scheduling over dates, availability given for a day of the week applies to every date
+    #  that falls on that day, unless availability is also given for the date itself; commitments
+    #  given for a day of the week happen on every such date
+    if days is DAYS:
+        j['myAvailability'] = {day: ranges2slots(j['myAvailability'].get(day, [])) for day in days}
+        j['myCommitments'] = {day: list(j.get('myCommitments', {}).get(day, [])) for day in days}
+    else:
+        availability = j['myAvailability']
+        commitments = j.get('myCommitments', {})
+        j['myAvailability'] = {day: ranges2slots(availability.get(day, availability.get(weekdayOf(day), []))) for day in days}
+        j['myCommitments'] = {day: commitments.get(weekdayOf(day), []) + commitments.get(day, []) for day in days}
+    if 'myCalendar' in j:
+        assert 'file' in j['myCalendar'], '"myCalendar" must provide "file"'
+        if days is DAYS:
+            assert 'weekOf' in j['myCalendar'], '"myCalendar" must provide "weekOf" (unless scheduling over dates)'
+            day = date.fromisoformat(j['myCalendar']['weekOf'])
+            weekStart = day - timedelta(days=(day.weekday() + 1) % 7)
+            dates = [weekStart + timedelta(days=i) for i in range(len(DAYS))]
+        else:
+            dates = [date.fromisoformat(day) for day in days]
+        calendarFilename = os.path.join(os.path.dirname(os.path.abspath(filename)), j['myCalendar']['file'])
+        busy = calendarBusyIntervals(calendarFilename, dates, loadConfig()['timeZone'])
+        for day,intervals in zip(days, busy):
+            j['myCommitments'][day] += [{'name': ' / '.join(names), 'time': slot2time(start), 'length': (end - start) * 30}
+                for start,end,names in intervals]
+    for day,commitments in j['myCommitments'].items():
+        # Remove any slots from myAvailability that conflict with these commitments
+        busy = mergeIntervals([(time2slot(c['time']), time2slot(c['time']) + int(c['length'] / 30), None) for c in commitments])
+        j['myAvailability'][day] = subtractIntervals(j['myAvailability'][day], busy)
+
+    myPhysicalLocation = j['myLocations']['physical'] if ('myLocations' in j) and ('physical' in j['myLocations']) else None
+    myRemoteLocation = j['myLocations']['remote'] if ('myLocations' in j) and ('remote' in j['myLocations']) else None
+
+    assert 'meetingsToSchedule' in  j, 'Input file did not provide any "meetingsToSchedule"'
+    meetings = j['meetingsToSchedule']
+    meetingDefaults = {
+        'length': 60,
+        'type': 'hybrid'
+    }
+    if myPhysicalLocation is not None:
+        meetingDefaults['physicalLocation'] = myPhysicalLocation
+    if myRemoteLocation is not None:
+        meetingDefaults['remoteLocation'] = myRemoteLocation
+    for i in range(len(meetings)):
+        meetings[i] = {**meetingDefaults, **meetings[i]}
+        assert 'name' in meetings[i], f'Meeting {i} has no "name"'
+        name = meetings[i]['name']
+        assert meetings[i]['length'] % 30 == 0, f'Length of meeting "{name}" is not a multiple of 30 (minutes)'
+        assert 'participants' in meetings[i], f'Meeting "{name}" has no "participants"'
+        mtype = meetings[i]['type']
+        if mtype == 'hybrid' or mtype == 'in-person':
+            assert 'physicalLocation' in meetings[i], 'Meeting "{name}" has no "physicalLocation"'
+        if mtype == 'hybrid' or mtype == 'remote':
+            assert 'remoteLocation' in meetings[i], 'Meeting "{name}" has no "remoteLocation"'
+        if mtype == 'in-person':
+            meetings[i].pop('remoteLocation', None)
+        if mtype == 'remote':
+            meetings[i].pop('physicalLocation', None)
+
+    return j
 
 '''
-Convert ranges of availabilities into a list of slots
+Convert ranges of availabilities into a sorted list of slots
 '''
 def ranges2slots(ranges):
-    slots = []
-    for r in  ranges:
-        rmin = datetime.strptime(r[0], "%I:%M %p")
-        rmax = datetime.strptime(r[1], "%I:%M %p")
-        t = rmin
-        while t <= rmax:
-            slots.append(datetime.strftime(t, "%I:%M %p"))
-            t += timedelta(minutes=30)
-    return  slots
-
-def makeWhen2Meets(inputjson):
+    slots = set()
+    for r in ranges:
+        slots.update(range(time2slot(r[0]), time2slot(r[1]) + 1))
+    return sorted(slots)
+
+def when2MeetJournalFilename(inputFilename):
+    return os.path.splitext(inputFilename)[0] + '.when2meets.jsonl'
+
+'''
+Returns:
+ - Key identifying the when2meet that would be created for a meeting, so that a journaled when2meet
+   is only reused for the same meeting over the same days and times (and not, say, for a new round
+   that reuses the input filename)
+'''
+def when2MeetJournalKey(name, timeZone, days, earliestTime, latestTime):
+    return hashlib.sha256(json.dumps([name, timeZone, days, earliestTime, latestTime]).encode()).hexdigest()
+
+'''
+Returns:
+ - Dictionary from journal key (see when2MeetJournalKey) to the URL of the when2meet that has
+   already been created for it (according to the when2meet journal)
+'''
+def readWhen2MeetJournal(inputFilename):
+    created = {}
+    if os.path.exists(when2MeetJournalFilename(inputFilename)):
+        with open(when2MeetJournalFilename(inputFilename)) as f:
+            for line in f:
+                # A crash while writing may leave a partial last line
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if 'key' in entry:
+                    created[entry['key']] = entry['when2meet']
+    return created
+
+'''
+Creates a when2meet for every meeting, several at once (up to "fetchConcurrency").
+Each when2meet's URL is recorded in a journal file as soon as it has been created, so if this is
+  interrupted, running it again only creates the when2meets that are still missing. (initScheduling
+  removes the journal once it has finished.)
+'''
+def makeWhen2Meets(inputFilename, inputjson):
     j = inputjson
     config = loadConfig()
     meetings = j['meetingsToSchedule']
 
-    availableDays = [day for day in DAYS if len(j['myAvailability'][day]) > 0]
-    allTimes =  [datetime.strptime(time, "%I:%M %p") for times in j['myAvailability'].values() for time in times]
-    # allTimes = [datetime.strptime(time, "%I:%M %p") for timepairs in j['myAvailability'].values() for timepair in timepairs for time in timepair]
-    earliestTime = datetime.strftime(min(allTimes), "%I:%M %p")
-    latestTime = datetime.strftime(max(allTimes), "%I:%M %p")
-
+    availableDays = [day for day,slots in j['myAvailability'].items() if len(slots) > 0]
+    allSlots = [slot for slots in j['myAvailability'].values() for slot in slots]
+    earliestTime = slot2time(min(allSlots))
+    latestTime = slot2time(max(allSlots))
+
+    keys = {meeting['name']: when2MeetJournalKey(meeting['name'], config['timeZone'], availableDays, earliestTime, latestTime)
+        for meeting in meetings}
+    created = readWhen2MeetJournal(inputFilename)
+    futures = {getFetchPool().submit(createWhen2Meet, meeting['name'], config['timeZone'], availableDays, earliestTime, latestTime): meeting
+        for meeting in meetings if not (keys[meeting['name']] in created)}
+    failed = {}
+    with open(when2MeetJournalFilename(inputFilename), 'a') as f:
+        for future in as_completed(futures):
+            meeting = futures[future]
+            key = keys[meeting['name']]
+            try:
+                created[key] = future.result()
+            except Exception as e:
+                failed[meeting['name']] = e
+                continue
+            f.write(json.dumps({'name': meeting['name'], 'key': key, 'when2meet': created[key], 'time': datetime.now().isoformat()}) + '\n')
+            f.flush()
+            countMetric('when2meetsCreated')
+    assert len(failed) == 0, f'Could not create when2meets for the following meetings (re-run to try again): {failed}'
     for meeting in meetings:
-        meeting['when2meet'] = createWhen2Meet(meeting['name'], config['timeZone'], availableDays, earliestTime, latestTime)
+        meeting['when2meet'] = created[keys[meeting['name']]]
         # meeting['when2meet'] = 'https://www.when2meet.com/?13981717-exqIc'
 
 __emailPassword = None
@@ -318,9 +1440,195 @@ def getEmailPassword():
         __emailPassword = getpass("Type your email password and press enter: ")
     return __emailPassword
 
-def sendInitialEmails(inputjson):
-    j = inputjson
-    people = loadPeople()
+'''
+Authenticated SMTP sessions, pooled and shared by all threads
+'''
+__smtpSessions = []
+__smtpLock = threading.Lock()
+
+'''
+Returns:
+ - A logged-in SMTP session
+ - Whether that session is an idle one being reused
+'''
+def acquireSMTPSession():
+    with __smtpLock:
+        if len(__smtpSessions) > 0:
+            return __smtpSessions.pop(), True
+    config = loadConfig()
+    context = ssl.create_default_context()
+    if config['emailUseSSL']:
+        server = smtplib.SMTP_SSL(config['emailServer'], config['emailPort'], context=context, timeout=60)
+    else:
+        server = smtplib.SMTP(config['emailServer'], config['emailPort'], timeout=60)
+        server.ehlo()
+        if server.has_extn('starttls'):
+            server.starttls(context=context)
+            server.ehlo()
+    server.ehlo_or_helo_if_needed()
+    # Servers that don't support authentication (e.g. a local test server) don't need a login
+    if server.has_extn('auth'):
+        server.login(config['emailAddress'], getEmailPassword())
+    return server, False
+
+def releaseSMTPSession(server):
+    with __smtpLock:
+        __smtpSessions.append(server)
+
+def closeSMTPSessions():
+    with __smtpLock:
+        sessions = __smtpSessions[:]
+        __smtpSessions.clear()
+    for server in sessions:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+__emailRateLock = threading.Lock()
+__nextEmailTime = 0
+def waitForEmailRateLimit():
+    global __nextEmailTime
+    with __emailRateLock:
+        now = time.monotonic()
+        wait = __nextEmailTime - now
+        __nextEmailTime = max(now, __nextEmailTime) + 1.0 / loadConfig()['emailsPerSecond']
+    if wait > 0:
+        time.sleep(wait)
+
+def isTransientEmailError(e):
+    if isinstance(e, smtplib.SMTPResponseException):
+        return 400 <= e.smtp_code < 500
+    return isinstance(e, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+'''
+Sends one email over a pooled session, retrying transient failures with exponential backoff
+'''
+def sendEmail(toAddress, message, backoff=2.0):
+    config = loadConfig()
+    attempt = 0
+    while True:
+        server, reused = None, False
+        try:
+            server, reused = acquireSMTPSession()
+            waitForEmailRateLimit()
+            server.sendmail(config['emailAddress'], toAddress, message)
+        except (smtplib.SMTPException, OSError) as e:
+            if server is not None:
+                try:
+                    server.close()
+                except (smtplib.SMTPException, OSError):
+                    pass
+            # The server may have closed an idle session; retry straight away on a new one
+            if reused and isinstance(e, (smtplib.SMTPServerDisconnected, OSError)):
+                continue
+            if not isTransientEmailError(e) or attempt >= config['emailRetries']:
+                countMetric('emailsFailed')
+                raise
+            countMetric('emailRetries')
+            time.sleep(backoff * 2**attempt)
+            attempt += 1
+        else:
+            releaseSMTPSession(server)
+            countMetric('emailsSent')
+            return
+
+def emailLogFilename(inputFilename):
+    return os.path.splitext(inputFilename)[0] + '.emails.jsonl'
+
+'''
+Returns:
+ - List of entries ({batch:, person:, email:, time:}) for every email that has been sent for this
+   input file, from the progress store if it is being used and from the email log file otherwise
+'''
+def readEmailLog(inputFilename):
+    if usingProgressStore():
+        with progressStore(inputFilename) as db:
+            rows = db.execute('SELECT batch, person, email, time FROM emails ORDER BY time').fetchall()
+        return [{'batch': batch, 'person': person, 'email': email, 'time': t} for batch,person,email,t in rows]
+    entries = []
+    if os.path.exists(emailLogFilename(inputFilename)):
+        with open(emailLogFilename(inputFilename)) as f:
+            for line in f:
+                if line.strip():
+                    entries.append(json.loads(line))
+    return entries
+
+def appendEmailLog(inputFilename, entry):
+    if usingProgressStore():
+        with progressStore(inputFilename, write=True) as db:
+            db.execute('INSERT OR IGNORE INTO emails VALUES (:batch, :person, :email, :time)', entry)
+    else:
+        with open(emailLogFilename(inputFilename), 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+
+'''
+Returns:
+ - Set of (batch, person) pairs for every email that has been sent for this input file
+'''
+def loadEmailLog(inputFilename):
+    return set((entry['batch'], entry['person']) for entry in readEmailLog(inputFilename))
+
+'''
+Returns:
+ - Time at which the most recent email whose batch name starts with batchPrefix was sent (or None)
+'''
+def lastEmailTime(inputFilename, batchPrefix=''):
+    times = [entry['time'] for entry in readEmailLog(inputFilename) if entry['batch'].startswith(batchPrefix)]
+    return None if len(times) == 0 else datetime.fromisoformat(max(times))
+
+'''
+Sends a batch of emails concurrently (subject to the configured rate limit).
+Every email that is sent is recorded in the input file's email log, and emails in this batch that
+  the log says have already been sent are skipped, so re-running an interrupted batch resumes it.
+Arguments:
+ - batch: Name identifying this batch of emails
+ - messages: Dictionary from person ID to (email address, message)
+ - logFilenames: Dictionary from person ID to the list of input files in whose email logs their
+   email is recorded, for emails that cover several input files (by default, just inputFilename)
+Returns:
+ - List of people to whom emails were sent
+ - Dictionary from people to whom emails could not be sent to the exception raised
+'''
+def sendEmails(inputFilename, batch, messages, verbose=True, logFilenames=None):
+    def log(msg):
+        if verbose:
+            print(msg)
+    if logFilenames is None:
+        logFilenames = {person: [inputFilename] for person in messages}
+    alreadySent = {filename: loadEmailLog(filename) for filename in set(f for fs in logFilenames.values() for f in fs)}
+    pending = {person: m for person,m in messages.items()
+        if not any([(batch, person) in alreadySent[filename] for filename in logFilenames[person]])}
+    if len(pending) < len(messages):
+        log(f'Skipping {len(messages) - len(pending)} emails in batch "{batch}" that were already sent')
+    if len(pending) == 0:
+        return [], {}
+
+    getEmailPassword()
+    logLock = threading.Lock()
+    def send(person, toAddress, message):
+        sendEmail(toAddress, message)
+        with logLock:
+            entry = {'batch': batch, 'person': person, 'email': toAddress, 'time': datetime.now().isoformat()}
+            for filename in logFilenames[person]:
+                appendEmailLog(filename, entry)
+
+    sent = []
+    failed = {}
+    with ThreadPoolExecutor(max_workers=loadConfig()['emailConnections']) as pool:
+        futures = {person: pool.submit(send, person, *m) for person,m in pending.items()}
+        for person,future in futures.items():
+            try:
+                future.result()
+                sent.append(person)
+            except Exception as e:
+                failed[person] = e
+    for person,e in failed.items():
+        log(f'Could not send email to {person} ({e})')
+    return sent, failed
+
+def sendInitialEmails(inputFilename, verbose=True):
+    j = loadInputFile(inputFilename)
     config = loadConfig()
     meetings = j['meetingsToSchedule']
 
@@ -330,30 +1638,27 @@ def sendInitialEmails(inputjson):
             if not (person in person2meetings):
                 person2meetings[person] = []
             person2meetings[person].append(meeting)
+    people = lookupPeople(person2meetings.keys())
 
     remindFreq = config['reminderFrequencyInHours']
     deadline = datetime.now().date() + timedelta(days=config['deadlineInDaysFromNow'])
     deadline = datetime.strftime(deadline, "%A, %B %d")
 
-    port = 465  # For SSL
-    password = getEmailPassword()
-    context = ssl.create_default_context()
-    with smtplib.SMTP_SSL(config['emailServer'], port, context=context) as server:
-        server.login(config['emailAddress'], password)
-        for person,meetings in person2meetings.items():
-            assert person in people, f'Person "{person}" not found in people.json'
-            personInfo = people[person]
-            assert 'name' in personInfo,  f'Person "{person}" missing "name" field' 
-            assert 'email' in personInfo,  f'Person "{person}" missing "email" field' 
-            name = personInfo['name']
-            firstname = name.split()[0]
-            email = personInfo['email']
-
-            linklist = ""
-            for meeting in meetings:
-                linklist += f"* {meeting['name']}: {meeting['when2meet']}\n"
-
-            message =  f"""\
+    messages = {}
+    for person,meetings in person2meetings.items():
+        assert person in people, f'Person "{person}" not found in people.json'
+        personInfo = people[person]
+        assert 'name' in personInfo,  f'Person "{person}" missing "name" field' 
+        assert 'email' in personInfo,  f'Person "{person}" missing "email" field' 
+        name = personInfo['name']
+        firstname = name.split()[0]
+        email = personInfo['email']
+
+        linklist = ""
+        for meeting in meetings:
+            linklist += f"* {meeting['name']}: {meeting['when2meet']}\n"
+
+        message =  f"""\
 Subject: Please provide your meeeting availability
 
 Hi {firstname},
@@ -365,12 +1670,14 @@ Note also that times are assumed to be in the {config['timeZone']} time zone.
 
 Please provide your availibility by {deadline}. You may receive reminder messages from this email address.
 """
-            server.sendmail(config['emailAddress'], email, message)
+        messages[person] = (email, message)
+    sent, failed = sendEmails(inputFilename, 'initial', messages, verbose)
+    assert len(failed) == 0, f'Could not send initial emails to {list(failed.keys())}; re-run to retry them'
 
 # Verify that all participants listed in all meetings have an entry in the 'people' file
 def checkParticipants(inputFile):
-    people = loadPeople()
     meetings = inputFile['meetingsToSchedule']
+    people = lookupPeople([person for meeting in meetings for person in meeting['participants']])
     missing_people = []
     for meeting in meetings:
         for person in meeting['participants']:
@@ -378,10 +1685,10 @@ def checkParticipants(inputFile):
                 missing_people.append(person)
     missing_people = set(missing_people)
     if len(missing_people) > 0:
-        print('The following participants do not appear in people.json:')
+        print(f'The following participants do not appear in {peopleDirectoryFilename()}:')
         for person in missing_people:
             print(f'   {person}')
-        print('Please add entries for them to people.json and then re-run Optimeet')
+        print(f'Please add entries for them to {peopleDirectoryFilename()} and then re-run Optimeet')
         sys.exit(1)
 
 def initScheduling(inputFilename, verbose=True):
@@ -391,14 +1698,18 @@ def initScheduling(inputFilename, verbose=True):
     inp = loadInputFile(inputFilename)
     log('Checking participants')
     checkParticipants(inp)
-    makeWhen2Meets(inp)
+    makeWhen2Meets(inputFilename, inp)
     log('Created when2meets')
-    sendInitialEmails(inp)
+    sendInitialEmails(inputFilename, verbose)
     log('Sent initial emails')
     prog = createProgressFile(inputFilename, inp)
-    log(f'Initial progress data saved to {progressFilename(inputFilename)}');
+    log(f'Initial progress data saved to {progressStoreFilename(inputFilename) if usingProgressStore() else progressFilename(inputFilename)}');
     saveProgressReportHTML(inputFilename, inp, prog)
     log(f'View progress report at {progressReportFilename(inputFilename)}');
+    # The when2meets are now recorded in the progress data; a later round with the same input
+    #  filename must create its own
+    if os.path.exists(when2MeetJournalFilename(inputFilename)):
+        os.remove(when2MeetJournalFilename(inputFilename))
 
 def progressFilename(inputFilename):
     return os.path.splitext(inputFilename)[0] + '.progress.json'
@@ -418,27 +1729,39 @@ def createProgressFile(inputFilename, inputjson):
             'numViableMeetingTimesSoFar': 0,
             'deadline': deadline
         })
-    with open(progressFilename(inputFilename), 'w') as f:
-        json.dump(progressData, f, sort_keys=True, indent=3)
+    saveProgressFile(inputFilename, progressData)
     return progressData
 
 def progressReportFilename(inputFilename):
     return os.path.splitext(progressFilename(inputFilename))[0] + '.html'
 
-def saveProgressReportHTML(inputFilename, inp, prog):
-    dirPath = os.path.dirname(os.path.abspath(__file__))
-    filename = os.path.join(dirPath, 'progress_template.html')
-    with open(filename) as f:
-        html = f.read()
-    html = html.replace('[[INPUTFILE]]', os.path.abspath(inputFilename))
-    html = html.replace('[[LASTCHECKED]]', datetime.strftime(datetime.now(), '%A %B %m, %I:%M %p'))
-    tableRows = '';
-    people = loadPeople()
+__progressTemplate = None
+'''
+Returns:
+ - The progress report template, split into a list that alternates between literal text and the
+   names of [[PLACEHOLDERS]]
+'''
+def loadProgressTemplate():
+    global __progressTemplate
+    if __progressTemplate is None:
+        dirPath = os.path.dirname(os.path.abspath(__file__))
+        filename = os.path.join(dirPath, 'progress_template.html')
+        with open(filename) as f:
+            __progressTemplate = re.split(r'\[\[(\w+)\]\]', f.read())
+    return __progressTemplate
+
+def progressReportRows(inp, prog):
+    people = lookupPeople([p for meeting in prog for p in meeting['hasResponded'] + meeting['hasNotResponded']])
+    name2meeting = {m['name']: m for m in inp['meetingsToSchedule']}
     for meeting in prog:
-        inpMeeting = next(m for m in inp['meetingsToSchedule'] if m['name'] == meeting['name'])
+        inpMeeting = name2meeting[meeting['name']]
         hasResponded = sorted([people[p]["name"] for p in meeting["hasResponded"]])
         hasNotResponded = sorted([people[p]["name"] for p in meeting["hasNotResponded"]])
-        tableRows += f'''\
+        impact = meeting.get('participantImpact', {})
+        leftOut = [f'{people[p]["name"]}: {n}' for p,n in impact.get('people', [])]
+        leftOut += [f'{people[p]["name"]} + {people[q]["name"]}: {n}' for p,q,n in impact.get('pairs', [])]
+        contention = [f'{name}: {n}' for name,n in meeting.get('contention', [])]
+        yield f'''\
         <tr>
             <td>{meeting["name"]}</td>
             <td>{inpMeeting["length"]}</td>
@@ -446,53 +1769,607 @@ def saveProgressReportHTML(inputFilename, inp, prog):
             <td>{"<br/>".join(hasResponded)}</td>
             <td>{"<br/>".join(hasNotResponded)}</td>
             <td>{meeting["numViableMeetingTimesSoFar"]}</td>
+            <td>{"<br/>".join(leftOut)}</td>
+            <td>{"<br/>".join(contention)}</td>
         </tr>
         '''
-    html = html.replace('[[TABLEROWS]]', tableRows)
-    with open(progressReportFilename(inputFilename), 'w') as f:
-        f.write(html)
+
+PROGRESSHASHMARKER = 'optimeet-content-hash:'
+
+def savedProgressReportHash(filename):
+    if not os.path.exists(filename):
+        return None
+    with open(filename, 'rb') as f:
+        f.seek(max(0, os.path.getsize(filename) - 256))
+        tail = f.read().decode('utf-8', errors='replace')
+    match = re.search(PROGRESSHASHMARKER + r'(\w+)', tail)
+    return None if match is None else match.group(1)
+
+'''
+Renders the progress report, one table row at a time, to a temporary file, which then replaces the
+  report only if its contents (other than the time it was generated) have changed. This way, open
+  browser tabs and file syncing tools don't see a new file unless there is something new in it.
+Returns:
+ - Whether the report was rewritten
+'''
+def saveProgressReportHTML(inputFilename, inp, prog):
+    values = {
+        'INPUTFILE': [os.path.abspath(inputFilename)],
+        'LASTCHECKED': [datetime.strftime(datetime.now(), '%A %B %m, %I:%M %p')],
+        'TABLEROWS': progressReportRows(inp, prog)
+    }
+    filename = progressReportFilename(inputFilename)
+    contentHash = hashlib.sha256()
+    with open(filename + '.tmp', 'w') as f:
+        for i,part in enumerate(loadProgressTemplate()):
+            isPlaceholder = i % 2 == 1
+            for text in (values.get(part, [f'[[{part}]]']) if isPlaceholder else [part]):
+                f.write(text)
+                if not (isPlaceholder and part == 'LASTCHECKED'):
+                    contentHash.update(text.encode('utf-8'))
+        f.write(f'\n<!-- {PROGRESSHASHMARKER}{contentHash.hexdigest()} -->\n')
+    if savedProgressReportHash(filename) == contentHash.hexdigest():
+        os.remove(filename + '.tmp')
+        return False
+    os.replace(filename + '.tmp', filename)
+    return True
 
 def loadProgressFile(inputFilename):
+    if usingProgressStore():
+        if not os.path.exists(progressStoreFilename(inputFilename)) and not os.path.exists(progressFilename(inputFilename)):
+            raise FileNotFoundError(f'No progress data for {inputFilename}')
+        with progressStore(inputFilename) as db:
+            return readStoredProgress(db)
     with open(progressFilename(inputFilename)) as f:
         j = json.load(f)
     return j
 
-def saveProgressFile(inputFilename, prog):
+'''
+Arguments:
+ - when2meets: Optional dictionary from meeting name to availability (see parseWhen2MeetHTML) for
+   meetings whose availability has changed; if the progress store is being used, a snapshot of this
+   availability is recorded along with the progress
+'''
+def saveProgressFile(inputFilename, prog, when2meets={}):
+    if usingProgressStore():
+        with progressStore(inputFilename, write=True) as db:
+            writeStoredProgress(db, prog)
+            checked = datetime.now().isoformat()
+            for name,when2meet in when2meets.items():
+                db.executemany('INSERT OR REPLACE INTO availability VALUES (?, ?, ?, ?)',
+                    [(name, checked, pid, format(mask, 'x')) for pid,mask in when2meet['available'].items()])
+        return
+    filename = progressFilename(inputFilename)
+    with open(filename + '.tmp', 'w') as f:
+        json.dump(prog, f, sort_keys=True, indent=3)
+    os.replace(filename + '.tmp', filename)
+
+def progressStoreFilename(inputFilename):
+    return os.path.splitext(inputFilename)[0] + '.progress.db'
+
+def usingProgressStore():
+    return loadConfig()['progressStore'] == 'sqlite'
+
+PROGRESSSTOREVERSION = 1
+PROGRESSSTORESCHEMA = [
+    '''CREATE TABLE meetings (
+        name TEXT PRIMARY KEY,
+        position INTEGER NOT NULL,
+        when2meet TEXT NOT NULL,
+        deadline TEXT NOT NULL,
+        numViableMeetingTimesSoFar INTEGER NOT NULL,
+        extra TEXT NOT NULL DEFAULT '{}'
+    )''',
+    '''CREATE TABLE respondents (
+        meeting TEXT NOT NULL,
+        person TEXT NOT NULL,
+        responded INTEGER NOT NULL,
+        PRIMARY KEY (meeting, person)
+    )''',
+    # One row per respondent each time a meeting's availability changes; slots are hex bitmasks
+    '''CREATE TABLE availability (
+        meeting TEXT NOT NULL,
+        checked TEXT NOT NULL,
+        person TEXT NOT NULL,
+        slots TEXT NOT NULL,
+        PRIMARY KEY (meeting, checked, person)
+    )''',
+    '''CREATE TABLE finalAvailability (
+        meeting TEXT PRIMARY KEY,
+        slots TEXT NOT NULL
+    )''',
+    '''CREATE TABLE emails (
+        batch TEXT NOT NULL,
+        person TEXT NOT NULL,
+        email TEXT NOT NULL,
+        time TEXT NOT NULL,
+        PRIMARY KEY (batch, person)
+    )'''
+]
+
+'''
+Opens the SQLite progress store for an input file and runs the body of the 'with' block in a single
+  transaction, which is committed if the block succeeds and rolled back otherwise.
+The store uses WAL mode, so reads never block and are never blocked by a write in another process
+  (e.g. 'remind' running while 'serve' is checking progress); writes take the write lock up front
+  and wait for each other.
+The first time the store is opened, any existing JSON progress file, email log, and final
+  availability file for the input file are imported into it.
+'''
+@contextmanager
+def progressStore(inputFilename, write=False):
+    filename = progressStoreFilename(inputFilename)
+    isNew = not os.path.exists(filename)
+    db = sqlite3.connect(filename, timeout=60, isolation_level=None)
+    try:
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        db.execute('BEGIN IMMEDIATE' if (write or isNew) else 'BEGIN')
+        try:
+            if db.execute('PRAGMA user_version').fetchone()[0] < PROGRESSSTOREVERSION:
+                for statement in PROGRESSSTORESCHEMA:
+                    db.execute(statement)
+                importJSONProgress(db, inputFilename)
+                db.execute(f'PRAGMA user_version = {PROGRESSSTOREVERSION}')
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+    finally:
+        db.close()
+
+def importJSONProgress(db, inputFilename):
+    if os.path.exists(progressFilename(inputFilename)):
+        with open(progressFilename(inputFilename)) as f:
+            writeStoredProgress(db, json.load(f))
+    if os.path.exists(emailLogFilename(inputFilename)):
+        with open(emailLogFilename(inputFilename)) as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        db.executemany('INSERT OR IGNORE INTO emails VALUES (:batch, :person, :email, :time)', entries)
+    if os.path.exists(availabilityFilename(inputFilename)):
+        avail = loadAvailabilityFile(inputFilename)
+        db.executemany('INSERT OR REPLACE INTO finalAvailability VALUES (?, ?)',
+            [(name, json.dumps(daytimes)) for name,daytimes in avail.items()])
+
+def readStoredProgress(db):
+    prog = []
+    for name,when2meet,deadline,numViable,extra in db.execute(
+            'SELECT name, when2meet, deadline, numViableMeetingTimesSoFar, extra FROM meetings ORDER BY position'):
+        prog.append({
+            **json.loads(extra),
+            'name': name,
+            'when2meet': when2meet,
+            'hasResponded': [],
+            'hasNotResponded': [],
+            'numViableMeetingTimesSoFar': numViable,
+            'deadline': deadline
+        })
+    name2meeting = {meeting['name']: meeting for meeting in prog}
+    for name,person,responded in db.execute('SELECT meeting, person, responded FROM respondents ORDER BY person'):
+        name2meeting[name]['hasResponded' if responded else 'hasNotResponded'].append(person)
+    return prog
+
+STOREDPROGRESSFIELDS = ['name', 'when2meet', 'hasResponded', 'hasNotResponded', 'numViableMeetingTimesSoFar', 'deadline']
+
+'''
+Brings the stored progress in line with prog, only writing the rows that have changed
+'''
+def writeStoredProgress(db, prog):
+    names = [meeting['name'] for meeting in prog]
+    for name, in db.execute('SELECT name FROM meetings').fetchall():
+        if not (name in names):
+            db.execute('DELETE FROM meetings WHERE name = ?', (name,))
+            db.execute('DELETE FROM respondents WHERE meeting = ?', (name,))
+    for position,meeting in enumerate(prog):
+        # Any other fields of the meeting's progress are stored together as JSON
+        extra = json.dumps({k: v for k,v in meeting.items() if not (k in STOREDPROGRESSFIELDS)}, sort_keys=True)
+        db.execute('''INSERT INTO meetings VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (name) DO UPDATE SET position = excluded.position, when2meet = excluded.when2meet,
+                deadline = excluded.deadline, numViableMeetingTimesSoFar = excluded.numViableMeetingTimesSoFar,
+                extra = excluded.extra
+            WHERE position != excluded.position OR when2meet != excluded.when2meet
+                OR deadline != excluded.deadline OR numViableMeetingTimesSoFar != excluded.numViableMeetingTimesSoFar
+                OR extra != excluded.extra''',
+            (meeting['name'], position, meeting['when2meet'], meeting['deadline'], meeting['numViableMeetingTimesSoFar'], extra))
+        responded = {**{p: 0 for p in meeting['hasNotResponded']}, **{p: 1 for p in meeting['hasResponded']}}
+        stored = dict(db.execute('SELECT person, responded FROM respondents WHERE meeting = ?', (meeting['name'],)).fetchall())
+        db.executemany('DELETE FROM respondents WHERE meeting = ? AND person = ?',
+            [(meeting['name'], p) for p in stored if not (p in responded)])
+        db.executemany('INSERT OR REPLACE INTO respondents VALUES (?, ?, ?)',
+            [(meeting['name'], p, r) for p,r in responded.items() if stored.get(p) != r])
+
+'''
+Writes the contents of an input file's progress store back out in the JSON formats used when the
+  store is not in use (progress file, email log, and final availability file, if there is one)
+'''
+def exportProgressStore(inputFilename, verbose=True):
+    def log(msg):
+        if verbose:
+            print(msg)
+    assert os.path.exists(progressStoreFilename(inputFilename)), f'No progress store found at {progressStoreFilename(inputFilename)}'
+    with progressStore(inputFilename) as db:
+        prog = readStoredProgress(db)
+        emails = db.execute('SELECT batch, person, email, time FROM emails ORDER BY time').fetchall()
+        avail = {name: json.loads(slots) for name,slots in db.execute('SELECT meeting, slots FROM finalAvailability')}
     with open(progressFilename(inputFilename), 'w') as f:
         json.dump(prog, f, sort_keys=True, indent=3)
+    log(f'Progress data exported to {progressFilename(inputFilename)}')
+    with open(emailLogFilename(inputFilename), 'w') as f:
+        for batch,person,email,t in emails:
+            f.write(json.dumps({'batch': batch, 'person': person, 'email': email, 'time': t}) + '\n')
+    log(f'Email log exported to {emailLogFilename(inputFilename)}')
+    if len(avail) > 0:
+        with open(availabilityFilename(inputFilename), 'w') as f:
+            json.dump(avail, f, sort_keys=True, indent=3)
+        log(f'Final availabilities exported to {availabilityFilename(inputFilename)}')
+
+def parseCacheFilename(inputFilename):
+    return os.path.splitext(inputFilename)[0] + '.cache.json'
+
+'''
+The parse cache stores, for each meeting, the hash and HTTP validators of the last when2meet page
+  downloaded for it, along with the availability parsed from that page
+'''
+def loadParseCache(inputFilename):
+    if not os.path.exists(parseCacheFilename(inputFilename)):
+        return {}
+    with open(parseCacheFilename(inputFilename)) as f:
+        return json.load(f)
+
+def saveParseCache(inputFilename, cache):
+    filename = parseCacheFilename(inputFilename)
+    with open(filename + '.tmp', 'w') as f:
+        json.dump(cache, f)
+    os.replace(filename + '.tmp', filename)
+
+'''
+Parsed availability depends on the page, but also on who the participants are (for name matching)
+  and on my availability, so cached availability is only reused if these are unchanged too
+'''
+def parseCacheKey(url, participants, myAvailability):
+    people = lookupPeople(participants)
+    key = {
+        'url': url,
+        'participants': sorted(participants),
+        'names': [people[p]['name'] for p in sorted(participants) if p in people],
+        'myAvailability': dayslots2mask(myAvailability, roundDays(myAvailability))
+    }
+    # The same mask means different times over different dates
+    if roundDays(myAvailability) != DAYS:
+        key['days'] = roundDays(myAvailability)
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+'''
+Works out which when2meet pages need to be downloaded to get the availability for an input file.
+If refresh is True, every when2meet is re-requested, and if it is a set of meeting names, those
+  meetings' when2meets are; otherwise, only those of meetings that have no previously-parsed
+  availability are.
+Returns a dictionary with the fields:
+ - 'cache': The parse cache (minus any entries that are out of date)
+ - 'keys': Dictionary from meeting name to its parse cache key
+ - 'urls': List of URLs to download
+ - 'validators': Dictionary from URL to the 'etag'/'lastModified' of the cached version of the page
+'''
+def planWhen2Meets(inputFilename, inp, prog, refresh=True):
+    cache = loadParseCache(inputFilename)
+    keys = {}
+    name2meeting = {m['name']: m for m in inp['meetingsToSchedule']}
+    for meeting in prog:
+        inpMeeting = name2meeting[meeting['name']]
+        keys[meeting['name']] = parseCacheKey(meeting['when2meet'], inpMeeting['participants'], inp['myAvailability'])
+        if meeting['name'] in cache and cache[meeting['name']]['key'] != keys[meeting['name']]:
+            del cache[meeting['name']]
+
+    refreshed = lambda name: (name in refresh) if isinstance(refresh, set) else refresh
+    toFetch = [meeting for meeting in prog if refreshed(meeting['name']) or not (meeting['name'] in cache)]
+    validators = {meeting['when2meet']: {'etag': cache[meeting['name']]['etag'], 'lastModified': cache[meeting['name']]['lastModified']}
+        for meeting in toFetch if meeting['name'] in cache}
+    return {'cache': cache, 'keys': keys, 'urls': [meeting['when2meet'] for meeting in toFetch], 'validators': validators}
+
+'''
+Gets the availability from each meeting's when2meet, downloading and parsing only what is needed
+  (see planWhen2Meets), and pages whose contents have not changed since the last download are not
+  reparsed.
+When getting the availability for several input files at once, the downloading and parsing can be
+  done up front: plan and pages are then the input file's plan and the pages downloaded for it, and
+  parsed maps the (page hash, parse cache key) of pages that have already been parsed to the result.
+Returns:
+ - Dictionary from meeting name to availability (see parseWhen2MeetHTML), or to the exception
+   raised while getting it
+ - List of names of meetings whose availability is new or has changed
+'''
+def getWhen2Meets(inputFilename, inp, prog, refresh=True, plan=None, pages=None, parsed={}):
+    if plan is None:
+        plan = planWhen2Meets(inputFilename, inp, prog, refresh)
+    cache, keys = plan['cache'], plan['keys']
+    if pages is None:
+        with timedPhase('fetch'):
+            pages = fetchPages(plan['urls'], plan['validators'])
+
+    when2meets = {}
+    changed = []
+    cacheChanged = False
+    name2meeting = {m['name']: m for m in inp['meetingsToSchedule']}
+    for meeting in prog:
+        name = meeting['name']
+        page = pages.get(meeting['when2meet']) if meeting['when2meet'] in plan['urls'] else None
+        if page is None or isinstance(page, Exception):
+            when2meets[name] = cache[name]['when2meet'] if page is None else page
+            continue
+        pageHash = None if page['page'] is None else hashlib.sha256(page['page']).hexdigest()
+        if name in cache and (pageHash is None or pageHash == cache[name]['hash']):
+            when2meets[name] = cache[name]['when2meet']
+            if page['etag'] != cache[name]['etag'] or page['lastModified'] != cache[name]['lastModified']:
+                cache[name].update(etag=page['etag'], lastModified=page['lastModified'])
+                cacheChanged = True
+            continue
+        if (pageHash, keys[name]) in parsed:
+            when2meet = parsed[(pageHash, keys[name])]
+        else:
+            inpMeeting = name2meeting[name]
+            when2meet = parseWhen2MeetSafely(page['page'], inpMeeting['participants'], inp['myAvailability'])
+        if isinstance(when2meet, Exception):
+            when2meets[name] = when2meet
+            continue
+        when2meets[name] = when2meet
+        cache[name] = {
+            'key': keys[name],
+            'hash': pageHash,
+            'etag': page['etag'],
+            'lastModified': page['lastModified'],
+            'when2meet': when2meet
+        }
+        changed.append(name)
+        cacheChanged = True
+    if cacheChanged:
+        saveParseCache(inputFilename, cache)
+    return when2meets, changed
+
+'''
+Returns:
+ - Availability parsed from a when2meet page (see parseWhen2MeetHTML), or the exception raised while
+   parsing it
+'''
+def parseWhen2MeetSafely(page, participants, myAvailability):
+    try:
+        with timedPhase('parse'):
+            return parseWhen2MeetHTML(page, participants, myAvailability)
+    except Exception as e:
+        return picklableFailure(e)
 
+'''
+Not every exception survives being sent to or from a worker process (e.g. an HTTPError can't be
+  unpickled, which breaks the whole pool), so failures are replaced by a RuntimeError describing
+  them before they cross over
+'''
+def picklableFailure(e):
+    return RuntimeError(repr(e))
+
+def picklableWhen2Meets(when2meets):
+    return {name: picklableFailure(w) if isinstance(w, Exception) else w for name,w in when2meets.items()}
+
+'''
+Calls f in a worker process. Whatever it raises is made picklable, and the metrics it accumulates
+  are sent back along with its result (see workerResult).
+'''
+def workerCall(f, *args):
+    countersBefore, phasesBefore = metricsSnapshot()
+    result, error = None, None
+    try:
+        result = f(*args)
+    except Exception as e:
+        error = picklableFailure(e)
+    counters, phases = metricsSince(countersBefore, phasesBefore)
+    return {'result': result, 'error': error, 'counters': counters, 'phases': phases}
+
+'''
+Waits for a call made with workerCall, merging its metrics into this process's
+Returns:
+ - The value returned by the call (or raises the exception that it raised)
+'''
+def workerResult(future):
+    ret = future.result()
+    mergeMetrics(ret['counters'], ret['phases'])
+    if ret['error'] is not None:
+        raise ret['error']
+    return ret['result']
+
+'''
+Gets the availability from each meeting's when2meet for several input files at once (see
+  getWhen2Meets). Each when2meet is only downloaded once, even if it appears in several input files,
+  and the pages that need parsing are parsed in parallel on a process pool.
+Arguments:
+ - rounds: Dictionary from input filename to (input file, progress data)
+Returns:
+ - Dictionary from input filename to the values returned by getWhen2Meets for that file
+'''
+def getAllWhen2Meets(rounds, pool, refresh=True):
+    plans = {filename: planWhen2Meets(filename, inp, prog, refresh) for filename,(inp,prog) in rounds.items()}
+    # A request can only be conditional if every input file that wants the page has the same
+    #  version of it cached
+    url2validators = {}
+    for plan in plans.values():
+        for url in plan['urls']:
+            url2validators.setdefault(url, []).append(plan['validators'].get(url))
+    validators = {url: vs[0] for url,vs in url2validators.items() if vs[0] is not None and all([v == vs[0] for v in vs])}
+    with timedPhase('fetch'):
+        pages = fetchPages(list(url2validators.keys()), validators)
+
+    jobs = {}
+    for filename,(inp,prog) in rounds.items():
+        plan = plans[filename]
+        name2meeting = {m['name']: m for m in inp['meetingsToSchedule']}
+        for meeting in prog:
+            page = pages.get(meeting['when2meet']) if meeting['when2meet'] in plan['urls'] else None
+            if page is None or isinstance(page, Exception) or page['page'] is None:
+                continue
+            pageHash = hashlib.sha256(page['page']).hexdigest()
+            cached = plan['cache'].get(meeting['name'])
+            if cached is None or cached['hash'] != pageHash:
+                inpMeeting = name2meeting[meeting['name']]
+                jobs[(pageHash, plan['keys'][meeting['name']])] = (page['page'], inpMeeting['participants'], inp['myAvailability'])
+    with timedPhase('parse'):
+        futures = {key: pool.submit(workerCall, parseWhen2MeetSafely, *args) for key,args in jobs.items()}
+        parsed = {key: workerResult(future) for key,future in futures.items()}
+
+    return {filename: getWhen2Meets(filename, inp, prog, refresh, plans[filename], pages, parsed)
+        for filename,(inp,prog) in rounds.items()}
+
+@instrumentedOperation
 def checkProgress(inputFilename, verbose=True):
+    with timedPhase('loadProgress'):
+        inp = loadInputFile(inputFilename)
+        prog = loadProgressFile(inputFilename)
+    when2meets, changed = getWhen2Meets(inputFilename, inp, prog)
+    return updateProgress(inputFilename, inp, prog, when2meets, changed, verbose)
+
+'''
+Updates the progress data of an input file (and its progress report) with the availability from
+  each meeting's when2meet (see getWhen2Meets)
+Returns:
+ - The updated progress data
+'''
+def updateProgress(inputFilename, inp, prog, when2meets, changed, verbose=True):
     def log(msg):
         if verbose:
             print(msg)
 
-    inp = loadInputFile(inputFilename)
-    prog = loadProgressFile(inputFilename)
-    for meeting in prog:
-        inpMeeting = next(m for m in inp['meetingsToSchedule'] if m['name'] == meeting['name'])
-        when2meet = parseWhen2Meet(meeting['when2meet'], inpMeeting['participants'], inp['myAvailability'])
-        ppl = respondents(when2meet)
-        ppl = list(set(ppl).intersection(set(inpMeeting['participants'])))
-        meeting['hasResponded'] = ppl
-        meeting['hasNotResponded'] = list(set(inpMeeting['participants']).difference(set(ppl)))
-        meetingLength = inpMeeting['length']
-        meeting['numViableMeetingTimesSoFar'] = numViableMeetingTimes(when2meet, meetingLength, ppl)
-    saveProgressFile(inputFilename, prog)
-    saveProgressReportHTML(inputFilename, inp, prog)
+    name2meeting = {m['name']: m for m in inp['meetingsToSchedule']}
+    with timedPhase('viability'):
+        for meeting in prog:
+            # A page that fails to download or parse leaves that meeting's progress as it was
+            when2meet = when2meets[meeting['name']]
+            if isinstance(when2meet, Exception):
+                log(f'Could not check when2meet for "{meeting["name"]}" ({when2meet}); keeping its previous progress')
+                continue
+            if not (meeting['name'] in changed):
+                continue
+            inpMeeting = name2meeting[meeting['name']]
+            for name,pids in when2meet.get('ambiguousNames', {}).items():
+                log(f'Warning: name "{name}" in when2meet for "{meeting["name"]}" matches several participants {pids}; assuming {pids[0]}')
+            ppl = respondents(when2meet)
+            ppl = list(set(ppl).intersection(set(inpMeeting['participants'])))
+            meeting['hasResponded'] = ppl
+            meeting['hasNotResponded'] = list(set(inpMeeting['participants']).difference(set(ppl)))
+            meetingLength = inpMeeting['length']
+            meeting['numViableMeetingTimesSoFar'] = numViableMeetingTimes(when2meet, meetingLength, ppl)
+            impact = participantImpact(when2meet, meetingLength, ppl)
+            if impact is None:
+                meeting.pop('participantImpact', None)
+            else:
+                meeting['participantImpact'] = impact
+    if len(changed) == 0:
+        log('Checked when2meets; no changes since last check')
+        return prog
+    with timedPhase('contention'):
+        # How much meetings compete for the same times depends on all of them, so it is recomputed
+        #  for every meeting whenever any of them changes
+        checked = [meeting for meeting in prog if not isinstance(when2meets[meeting['name']], Exception)]
+        name2length = {m['name']: m['length'] for m in inp['meetingsToSchedule']}
+        contention = batchViability([when2meets[m['name']] for m in checked], [name2length[m['name']] for m in checked],
+            [m['hasResponded'] for m in checked])
+        name2contention = meetingContention([m['name'] for m in checked], contention)
+        for i,meeting in enumerate(checked):
+            meeting['contention'] = name2contention[meeting['name']]
+            for j in range(i + 1, len(checked)):
+                if contention[i][i] == 1 and contention[j][j] == 1 and contention[i][j] == 1:
+                    log(f'Warning: "{meeting["name"]}" and "{checked[j]["name"]}" can only take place at the same time')
+    with timedPhase('saveProgress'):
+        saveProgressFile(inputFilename, prog, {name: when2meets[name] for name in changed})
+    with timedPhase('saveProgressReport'):
+        saveProgressReportHTML(inputFilename, inp, prog)
     log('Checked when2meets; progress report updated')
     return prog
 
+'''
+Returns:
+ - Set of names of meetings whose when2meets are due to be checked by pollProgress. Meetings that
+   everyone has responded to are frozen (never checked again), and the first check after a
+   meeting's deadline is always due, so that every meeting gets a final sweep.
+Arguments:
+ - pollSchedule: Dictionary from meeting name to the time of its next check and its current interval
+   between checks (in seconds), and whether it has been checked since its deadline; meetings that
+   are not in it are due
+'''
+def dueMeetings(prog, pollSchedule, now):
+    due = set()
+    for meeting in prog:
+        if len(meeting['hasNotResponded']) == 0:
+            continue
+        poll = pollSchedule.get(meeting['name'])
+        overdue = now >= datetime.strptime(meeting['deadline'], '%x').timestamp()
+        if poll is None or now >= poll['next'] or (overdue and not poll['checkedSinceDeadline']):
+            due.add(meeting['name'])
+    return due
+
+POLLBACKOFF = 2
+
+'''
+Schedules the next check of each meeting that was just checked by pollProgress: a meeting whose
+  when2meet changed is checked again after "activeProgressCheckFrequencyInHours", and each check
+  that finds no change doubles the interval, up to "maxProgressCheckFrequencyInHours"
+'''
+def updatePollSchedule(prog, pollSchedule, checked, changed, now):
+    config = loadConfig()
+    for meeting in prog:
+        name = meeting['name']
+        if not (name in checked):
+            continue
+        if name in changed:
+            interval = config['activeProgressCheckFrequencyInHours'] * 3600
+        elif name in pollSchedule:
+            interval = min(pollSchedule[name]['interval'] * POLLBACKOFF, config['maxProgressCheckFrequencyInHours'] * 3600)
+        else:
+            interval = config['progressCheckFrequencyInHours'] * 3600
+        pollSchedule[name] = {
+            'next': now + interval,
+            'interval': interval,
+            'checkedSinceDeadline': now >= datetime.strptime(meeting['deadline'], '%x').timestamp()
+        }
+
+'''
+Checks progress (see checkProgress) for the long-running check/remind loops, only downloading the
+  when2meets of meetings that are due to be checked (see dueMeetings) and then scheduling their
+  next checks (see updatePollSchedule) in pollSchedule
+Returns:
+ - The updated progress data
+ - Time (in seconds since the epoch) at which the next meeting is due to be checked (including
+   the final sweep at each meeting's deadline), or None if everyone has responded to every meeting
+'''
+@instrumentedOperation
+def pollProgress(inputFilename, pollSchedule, verbose=True):
+    now = time.time()
+    with timedPhase('loadProgress'):
+        inp = loadInputFile(inputFilename)
+        prog = loadProgressFile(inputFilename)
+    due = dueMeetings(prog, pollSchedule, now)
+    if len(due) > 0:
+        when2meets, changed = getWhen2Meets(inputFilename, inp, prog, refresh=due)
+        prog = updateProgress(inputFilename, inp, prog, when2meets, changed, verbose)
+        updatePollSchedule(prog, pollSchedule, due, changed, now)
+    active = []
+    for meeting in prog:
+        if len(meeting['hasNotResponded']) == 0 or not (meeting['name'] in pollSchedule):
+            continue
+        poll = pollSchedule[meeting['name']]
+        active.append(poll['next'])
+        # Wake up at the deadline for the meeting's final sweep, rather than at its next check
+        if not poll['checkedSinceDeadline']:
+            active.append(datetime.strptime(meeting['deadline'], '%x').timestamp())
+    return prog, min(active, default=None)
+
 '''
 Returns list of people to whom reminder emails were sent
 '''
+@instrumentedOperation
 def sendReminderEmails(inputFilename, verbose=True):
     def log(msg):
         if verbose:
             print(msg)
 
-    config = loadConfig()
-    people = loadPeople()
-    progressData = loadProgressFile(inputFilename)
+    with timedPhase('loadProgress'):
+        progressData = loadProgressFile(inputFilename)
 
     people2meetings = {}
     for meeting in progressData:
@@ -501,26 +2378,79 @@ def sendReminderEmails(inputFilename, verbose=True):
                 people2meetings[person] = []
             people2meetings[person].append(meeting)
     
-    remindFreq = config['reminderFrequencyInHours']
+    people = lookupPeople(people2meetings.keys())
+    messages = {person: reminderMessage(people[person], meetings) for person,meetings in people2meetings.items()}
 
-    port = 465  # For SSL
-    password = getEmailPassword()
-    context = ssl.create_default_context()
-    with smtplib.SMTP_SSL("smtp.gmail.com", port, context=context) as server:
-        server.login(config['emailAddress'], password)
-        for person,meetings in people2meetings.items():
-            personInfo = people[person]
-            name = personInfo['name']
-            firstname = name.split()[0]
-            email = personInfo['email']
-            deadline = datetime.strptime(meeting['deadline'], '%x')
-            overdue = datetime.now() > deadline
-            deadline = datetime.strftime(deadline, "%A, %B %d")
-            deadlineStatement  = f'Your availability is now overdue (the deadline was {deadline})' if overdue else f'Please provide your availibility by {deadline}'
-            linklist = ""
-            for meeting in meetings:
-                linklist += f"* {meeting['name']}: {meeting['when2meet']}\n"
-            msg = f'''\
+    with timedPhase('sendEmails'):
+        remindees, failed = sendEmails(inputFilename, reminderBatch(), messages, verbose)
+    log(f'Sent reminder emails to {remindees}')
+    return remindees
+
+'''
+Sends one reminder email to each person who has not yet filled out some of their when2meets, across
+  every active input file in a directory (see activeInputFiles), rather than one per input file.
+The email is recorded in the email log of every input file it covers, so it counts as that input
+  file's reminder for this period (see sendReminderEmails).
+Returns list of people to whom reminder emails were sent
+'''
+@instrumentedOperation
+def sendReminderDigest(dirname, verbose=True):
+    def log(msg):
+        if verbose:
+            print(msg)
+
+    people2meetings = {}
+    people2inputFiles = {}
+    for inputFilename in activeInputFiles(dirname):
+        with timedPhase('loadProgress'):
+            progressData = loadProgressFile(inputFilename)
+        for meeting in progressData:
+            for person in meeting['hasNotResponded']:
+                people2meetings.setdefault(person, []).append(meeting)
+                if not (inputFilename in people2inputFiles.setdefault(person, [])):
+                    people2inputFiles[person].append(inputFilename)
+
+    people = lookupPeople(people2meetings.keys())
+    messages = {person: reminderMessage(people[person], meetings) for person,meetings in people2meetings.items()}
+    with timedPhase('sendEmails'):
+        remindees, failed = sendEmails(None, reminderBatch(), messages, verbose, people2inputFiles)
+    log(f'Sent reminder digest emails to {remindees}')
+    return remindees
+
+'''
+Returns:
+ - Name of the batch of emails for the current reminder period. Reminders are batched by reminder
+   period, so that re-running a reminder within the same period only sends the reminders that
+   didn't go out the first time.
+'''
+def reminderBatch():
+    period = int(time.time() // (loadConfig()['reminderFrequencyInHours'] * 3600))
+    return f'reminder-{period}'
+
+'''
+Returns:
+ - Email address of a person (given their {name:, email:} info)
+ - Reminder email asking them to fill out the when2meets of some meetings (entries of the progress
+   data, which may come from several input files with different deadlines)
+'''
+def reminderMessage(personInfo, meetings):
+    config = loadConfig()
+    name = personInfo['name']
+    firstname = name.split()[0]
+    email = personInfo['email']
+    remindFreq = config['reminderFrequencyInHours']
+    deadlines = [datetime.strptime(meeting['deadline'], '%x') for meeting in meetings]
+    overdue = datetime.now() > min(deadlines)
+    deadline = datetime.strftime(min(deadlines), "%A, %B %d")
+    if len(set(deadlines)) == 1:
+        deadlineStatement  = f'Your availability is now overdue (the deadline was {deadline})' if overdue else f'Please provide your availibility by {deadline}'
+    else:
+        deadlineStatement = f'Some of your availability is now overdue (the earliest deadline was {deadline})' if overdue else 'Please provide your availibility by the deadline listed for each meeting'
+    linklist = ""
+    for meeting,meetingDeadline in zip(meetings, deadlines):
+        due = '' if len(set(deadlines)) == 1 else f' (due {datetime.strftime(meetingDeadline, "%A, %B %d")})'
+        linklist += f"* {meeting['name']}: {meeting['when2meet']}{due}\n"
+    msg = f'''\
 Subject: [{"OVERDUE" if overdue else "Reminder"}] Please provide your meeeting availability
 
 Hi {firstname},
@@ -532,11 +2462,11 @@ Note also that times are assumed to be in the {config['timeZone']} time zone.
 
 {deadlineStatement}. You will continue to receive a reminder message from this email address every {remindFreq} hours.
 '''
-            server.sendmail(config['emailAddress'], email, msg)
-    
-    remindees = list(people2meetings.keys())
-    log(f'Sent reminder emails to {remindees}')
-    return remindees
+    return email, msg
+
+# Key under which the availability file also records, for each meeting, the participants whose
+#  removal would give it more viable times (see participantImpact)
+AVAILIMPACTKEY = '__participantImpact__'
 
 def availabilityFilename(inputFilename):
     return os.path.splitext(inputFilename)[0] + '.avail.json'
@@ -546,30 +2476,50 @@ def saveFinalAvailability(inputFilename):
     prog  = loadProgressFile(inputFilename)
     config = loadConfig()
     availabilities = {}
+    impacts = {}
+    # Use the availability from the most recent check, rather than downloading everything again
+    when2meets,_ = getWhen2Meets(inputFilename, inp, prog, refresh=False)
+    failed = [name for name,when2meet in when2meets.items() if isinstance(when2meet, Exception)]
+    assert len(failed) == 0, f'Could not get the when2meets for the following meetings: {failed}'
+    name2meeting = {m['name']: m for m in inp['meetingsToSchedule']}
     for meeting in prog:
-        inpMeeting = next(m for m in inp['meetingsToSchedule'] if m['name'] == meeting['name'])
-        when2meet = parseWhen2Meet(meeting['when2meet'], inpMeeting['participants'], inp['myAvailability'])
+        when2meet = when2meets[meeting['name']]
         avail = viableSlots(when2meet, meeting['hasResponded'])
-        if all(len(slots) == 0 for slots in avail.values()) and config['useBestSlotsIfNoneViable']:
+        if avail == 0 and config['useBestSlotsIfNoneViable']:
             avail = slotsWithMostAvailable(when2meet, meeting['hasResponded'])
-        # Turn when2meet into a map from days to lists of times
-        availabilities[meeting['name']] = {day: [slot['time'] for slot in slots] for day,slots in avail.items()}
+        # Turn slot bitmask into a map from days to lists of times
+        availabilities[meeting['name']] = mask2daytimes(avail, roundDays(inp['myAvailability']))
+        inpMeeting = name2meeting[meeting['name']]
+        impact = participantImpact(when2meet, inpMeeting['length'], meeting['hasResponded'])
+        if impact is not None:
+            impacts[meeting['name']] = impact
     filename = availabilityFilename(inputFilename)
     with open(filename, 'w') as f:
-        json.dump(availabilities, f, sort_keys=True, indent=3)
+        json.dump({**availabilities, AVAILIMPACTKEY: impacts}, f, sort_keys=True, indent=3)
+    if usingProgressStore():
+        with progressStore(inputFilename, write=True) as db:
+            db.executemany('INSERT OR REPLACE INTO finalAvailability VALUES (?, ?)',
+                [(name, json.dumps(daytimes)) for name,daytimes in availabilities.items()])
     return availabilities
 
 def loadAvailabilityFile(inputFilename):
-    with open(availabilityFilename(inputFilename)) as f:
+    return readAvailabilityFile(availabilityFilename(inputFilename))
+
+def readAvailabilityFile(filename):
+    with open(filename) as f:
         j = json.load(f)
+    j.pop(AVAILIMPACTKEY, None)
     return j
 
+'''
+Returns:
+ - Earliest and latest slots that appear in an availability file
+'''
 def timeRange(avail):
-    def add(a,b):
-        return a + b
-    times = reduce(add, [reduce(add, day2times.values(), []) for day2times in avail.values()], [])
-    times = list(map(lambda t: datetime.strptime(t, "%I:%M %p"), times))
-    return min(times), max(times)
+    slots = [time2slot(t) for day2times in avail.values() for times in day2times.values() for t in times]
+    return min(slots), max(slots)
+
+POLLTICKSECONDS = 60
 
 def doPeriodicChecksAndReminders(inputFilename, verbose=True):
 
@@ -583,44 +2533,215 @@ def doPeriodicChecksAndReminders(inputFilename, verbose=True):
             print(msg)
 
     config = loadConfig()
-    progCheckFreq = config['progressCheckFrequencyInHours']
+    minCheckFreq = config['activeProgressCheckFrequencyInHours']
+    maxCheckFreq = config['maxProgressCheckFrequencyInHours']
     remindFreq = config['reminderFrequencyInHours'] 
 
+    # Each meeting's when2meet is checked at its own rate (see pollProgress)
+    pollSchedule = {}
+    nextCheck = time.time() + config['progressCheckFrequencyInHours'] * 3600
     def progCheckJob():
-        meetings = checkProgress(inputFilename, verbose)
+        nonlocal nextCheck
+        if time.time() < nextCheck:
+            return
+        meetings, nextCheck = pollProgress(inputFilename, pollSchedule, verbose)
         if all([len(m['hasNotResponded']) == 0 for m in meetings]):
             schedule.clear()
 
     def reminderJob():
         sendReminderEmails(inputFilename, verbose)
 
-    schedule.every(progCheckFreq).hours.do(progCheckJob)
+    schedule.every(POLLTICKSECONDS).seconds.do(progCheckJob)
     schedule.every(remindFreq).hours.do(reminderJob)
     # schedule.every(20).seconds.do(progCheckJob)
     # schedule.every(40).seconds.do(reminderJob)
 
-    log(f'Checking when2meets every {progCheckFreq} hours and sending reminder emails every {remindFreq} hours...')
+    log(f'Checking when2meets every {minCheckFreq} to {maxCheckFreq} hours (depending on how actively they are changing) and sending reminder emails every {remindFreq} hours...')
     while len(schedule.get_jobs()) > 0:
         schedule.run_pending()
         time.sleep(1)
     log('DONE (All when2meets have been filled out by all participants)')
     finalize(inputFilename, verbose)
 
+'''
+Returns:
+ - List of input files in a directory that have been started (i.e. which have a progress file)
+'''
+def startedInputFiles(dirname):
+    inputFiles = []
+    progFilenames = glob.glob(os.path.join(dirname, '*.progress.json')) + glob.glob(os.path.join(dirname, '*.progress.db'))
+    for progFilename in sorted(progFilenames):
+        suffix = '.progress.json' if progFilename.endswith('.progress.json') else '.progress.db'
+        inputFilename = progFilename[:-len(suffix)] + '.json'
+        if os.path.exists(inputFilename) and not (inputFilename in inputFiles):
+            inputFiles.append(inputFilename)
+    return inputFiles
+
+'''
+Returns:
+ - List of input files in a directory for which availability is still being gathered (i.e. which
+   have been started but have not yet been finalized)
+'''
+def activeInputFiles(dirname):
+    return [filename for filename in startedInputFiles(dirname) if not os.path.exists(availabilityFilename(filename))]
+
+SERVERESCANSECONDS = 300
+
+'''
+Runs the check/remind loop for every active input file in a directory in a single process.
+Each input file gets its own task on one asyncio event loop, which sleeps until that file's next
+  check or reminder is due; the blocking work itself runs on worker threads, which share the same
+  HTTP connection pool and SMTP session pool.
+The directory is rescanned periodically, so rounds started after the daemon will be picked up.
+All state is reloaded from files (progress files and email logs), so the daemon can be stopped
+  and restarted at any time.
+'''
+def serveDirectory(dirname, verbose=True):
+
+    # Ensure that we have the user's email password before we start the event loop
+    getEmailPassword()
+
+    def log(msg):
+        if verbose:
+            now = datetime.now()
+            msg = f'[{datetime.strftime(now, "%c")}] ' + msg
+            print(msg)
+
+    config = loadConfig()
+    minCheckFreq = config['activeProgressCheckFrequencyInHours']
+    maxCheckFreq = config['maxProgressCheckFrequencyInHours']
+    remindFreq = config['reminderFrequencyInHours'] * 3600
+
+    async def runRound(inputFilename):
+        # Resume the reminder schedule from the last reminder (or initial email) that was sent
+        lastReminder = lastEmailTime(inputFilename)
+        nextReminder = time.time() + remindFreq
+        if lastReminder is not None:
+            nextReminder = lastReminder.timestamp() + remindFreq
+        if config['reminderDigest']:
+            # Reminders for all rounds are sent together by runDigest instead
+            nextReminder = float('inf')
+        # Each meeting's when2meet is checked at its own rate (see pollProgress)
+        pollSchedule = {}
+        nextCheck = time.time()
+        while True:
+            await asyncio.sleep(max(0, min(nextCheck, nextReminder) - time.time()))
+            try:
+                if time.time() >= nextCheck:
+                    nextCheck = time.time() + minCheckFreq * 3600
+                    meetings, nextPoll = await asyncio.to_thread(pollProgress, inputFilename, pollSchedule, verbose)
+                    # Nothing is left to poll once everyone has responded, but if finalizing then
+                    #  fails, it is retried at the next check
+                    if nextPoll is not None:
+                        nextCheck = nextPoll
+                    if all([len(m['hasNotResponded']) == 0 for m in meetings]):
+                        log(f'DONE with {inputFilename} (All when2meets have been filled out by all participants)')
+                        await asyncio.to_thread(finalize, inputFilename, verbose)
+                        return
+                if time.time() >= nextReminder:
+                    nextReminder = time.time() + remindFreq
+                    await asyncio.to_thread(sendReminderEmails, inputFilename, verbose)
+            except Exception as e:
+                # Problems with one round shouldn't stop the others; try again next time
+                log(f'Error while processing {inputFilename}: {e!r}')
+
+    async def runDigest():
+        lastReminders = [t for t in [lastEmailTime(f) for f in activeInputFiles(dirname)] if t is not None]
+        nextReminder = time.time() + remindFreq
+        if len(lastReminders) > 0:
+            nextReminder = max(lastReminders).timestamp() + remindFreq
+        while True:
+            await asyncio.sleep(max(0, nextReminder - time.time()))
+            nextReminder = time.time() + remindFreq
+            try:
+                await asyncio.to_thread(sendReminderDigest, dirname, verbose)
+            except Exception as e:
+                log(f'Error while sending reminder digest: {e!r}')
+
+    async def main():
+        rounds = {}
+        if config['reminderDigest']:
+            log(f'Sending one reminder email per person for all rounds every {remindFreq / 3600} hours...')
+            digest = asyncio.create_task(runDigest())
+        while True:
+            for inputFilename in activeInputFiles(dirname):
+                if not (inputFilename in rounds) or rounds[inputFilename].done():
+                    if not (inputFilename in rounds):
+                        log(f'Checking {inputFilename} every {minCheckFreq} to {maxCheckFreq} hours (depending on how actively its when2meets are changing) and sending reminder emails every {remindFreq / 3600} hours...')
+                    rounds[inputFilename] = asyncio.create_task(runRound(inputFilename))
+            await asyncio.sleep(SERVERESCANSECONDS)
+
+    asyncio.run(main())
+
+@instrumentedOperation
 def finalize(inputFilename, verbose=True):
     def log(msg):
         if verbose:
             print(msg)
-    saveFinalAvailability(inputFilename)
+    with timedPhase('saveFinalAvailability'):
+        saveFinalAvailability(inputFilename)
     log(f'Final availabilities saved to {availabilityFilename(inputFilename)}')
-    createInterfaceHTML(inputFilename)
+    with timedPhase('createInterfaceHTML'):
+        createInterfaceHTML(inputFilename)
     log(f'Web interface saved to {interfaceFilename(inputFilename)}')
 
 def interfaceFilename(inputFilename):
     return os.path.splitext(inputFilename)[0] + '.interface.html'
 
+def compactJSON(j):
+    return json.dumps(j, separators=(',', ':'))
+
+'''
+Converts a bitmask over the slots of a round into one over the cells of the interface calendar,
+  which has a column for each of the ndays days and a row for each of the ntimes slots starting at
+  minSlot; the cell in column d and row t is bit d * ntimes + t
+'''
+def mask2cells(mask, minSlot, ntimes, ndays):
+    bits = maskBits(mask, ndays * SLOTSPERDAY)
+    cells = ''.join([bits[d * SLOTSPERDAY + minSlot : d * SLOTSPERDAY + minSlot + ntimes] for d in range(ndays)])
+    return int(cells[::-1] or '0', 2)
+
+'''
+Returns:
+ - A bitmask over the cells of the interface calendar (see mask2cells), as a base64 string of its
+   bytes in little-endian order
+'''
+def mask2cellbitmap(mask, minSlot, ntimes, ndays):
+    nbytes = (ndays * ntimes + 7) // 8
+    return base64.b64encode(mask2cells(mask, minSlot, ntimes, ndays).to_bytes(nbytes, 'little')).decode('ascii')
+
+'''
+Returns:
+ - Dictionary with the valid slots of each meeting (restricted to myAvailability) as cell bitmaps
+   (see mask2cellbitmap), and the number of meetings valid in each cell, in cell order
+'''
+def encodeInterfaceAvailability(avail, myAvailability, minSlot, ntimes):
+    days = roundDays(myAvailability)
+    mine = dayslots2mask(myAvailability, days)
+    masks = {name: daytimes2mask(daytimes, days) & mine for name,daytimes in avail.items()}
+    counts = [0] * (len(days) * ntimes)
+    for mask in masks.values():
+        for cell in maskIndices(mask2cells(mask, minSlot, ntimes, len(days))):
+            counts[cell] += 1
+    return {
+        'validSlots': {name: mask2cellbitmap(mask, minSlot, ntimes, len(days)) for name,mask in masks.items()},
+        'slotCounts': counts
+    }
+
+DAYABBREVIATIONS = ['Sun', 'Mon', 'Tues', 'Weds', 'Thurs', 'Fri', 'Sat']
+
+'''
+Returns:
+ - The heading of a day's column in the interface calendar
+'''
+def dayHeading(day):
+    if isDate(day):
+        d = date.fromisoformat(day)
+        return f'{DAYABBREVIATIONS[DAYS.index(weekdayOf(day))]} {d.month}/{d.day}'
+    return DAYABBREVIATIONS[DAYS.index(day)]
+
 def createInterfaceHTML(inputFilename):
     config = loadConfig()
-    people = loadPeople()
     inp = loadInputFile(inputFilename)
     avail = loadAvailabilityFile(inputFilename)
     dirPath = os.path.dirname(os.path.abspath(__file__))
@@ -628,45 +2749,545 @@ def createInterfaceHTML(inputFilename):
     with open(filename) as f:
         html = f.read()
 
-    # Check format of time fields myCommitments
+    # Normalize the format of time fields in myCommitments
     # (Improper formatting can cause them to silently not be displayed in the interface)
-    for day,commitments in inp['myCommitments'].items():
-        for commitment in commitments:
-            assert re.match(r'\d\d:\d\d [AP]M', commitment['time']), f'Invalid time format in existing commitment for {commitment["name"]}'
+    myCommitments = {day: [{**commitment, 'time': slot2time(time2slot(commitment['time']))} for commitment in commitments]
+        for day,commitments in inp['myCommitments'].items()}
 
-    # Inject config
-    html = html.replace('let config = undefined;', f'let config = {json.dumps(config)}');
-    # Inject all the people who participate in these meetings
-    participants = set(reduce(lambda a,b: a+b, [m['participants'] for m in inp['meetingsToSchedule']]))
-    relevantPeople = {k:v for k,v in people.items() if k in participants}
-    html = html.replace('let people = undefined;', f'let people = {json.dumps(relevantPeople)};')
-    html = html.replace('let meetings = undefined;', f'let meetings = {json.dumps(inp["meetingsToSchedule"])};')
-    # Inject user availability, participant availability, and user commitments
-    html = html.replace('let myAvailability = undefined;', f'let myAvailability = {json.dumps(inp["myAvailability"])};')
-    html = html.replace('let meeting2validslots = undefined;', f'let meeting2validslots = {json.dumps(avail)};')
-    html = html.replace('let myCommitments = undefined;', f'let myCommitments = {json.dumps(inp["myCommitments"])};')
-
-    # Create DOM elements for rows of calendar (according to availability)
-    calendarRows = ''
+    # Create DOM elements for the columns and rows of calendar (according to availability)
+    days = roundDays(inp['myAvailability'])
+    calendarHeader = ''.join([f"<th scope='col'>{dayHeading(day)}</th>" for day in days])
+    calendarRows = []
     times = []
-    minTime, maxTime = timeRange(avail)
-    currTime = minTime
-    while currTime <= maxTime:
-        timestr = datetime.strftime(currTime, "%I:%M %p")
-        calendarRows += f'''
+    minSlot, maxSlot = timeRange(avail)
+    for slot in range(minSlot, maxSlot + 1):
+        timestr = slot2time(slot)
+        calendarRows.append(f'''
         <tr>
             <th scope="row">{timestr}</th>
-            {''.join([f'<td day="{DAYS[i]}" time="{timestr}"></td>' for i in range(7)])}
+            {''.join([f'<td day="{day}" time="{timestr}"></td>' for day in days])}
         </tr>
-        '''
+        ''')
         times.append(timestr)
-        currTime += timedelta(minutes=30)
-    html = html.replace('[[CALENDARROWS]]', calendarRows)
-    html = html.replace('const TIMES = undefined;', f'const TIMES = {json.dumps(times)};')
+    html = html.replace('[[CALENDARHEADER]]', calendarHeader)
+    html = html.replace('[[CALENDARROWS]]', ''.join(calendarRows))
+    html = html.replace('const DAYS = undefined;', f'const DAYS = {compactJSON(days)};')
+    html = html.replace('const TIMES = undefined;', f'const TIMES = {compactJSON(times)};')
+
+    # Inject config
+    html = html.replace('let config = undefined;', f'let config = {compactJSON(config)}');
+    # Inject all the people who participate in these meetings
+    participants = set(reduce(lambda a,b: a+b, [m['participants'] for m in inp['meetingsToSchedule']]))
+    relevantPeople = lookupPeople(participants)
+    html = html.replace('let people = undefined;', f'let people = {compactJSON(relevantPeople)};')
+    html = html.replace('let meetings = undefined;', f'let meetings = {compactJSON(inp["meetingsToSchedule"])};')
+    # Inject user commitments, and participant availability (restricted to user availability)
+    html = html.replace('let myCommitments = undefined;', f'let myCommitments = {compactJSON(myCommitments)};')
+    payload = encodeInterfaceAvailability(avail, inp['myAvailability'], minSlot, len(times))
+    html = html.replace('let availabilityPayload = undefined;', f'let availabilityPayload = {compactJSON(payload)};')
+    # Inject the schedule found by 'solve', if there is one
+    if os.path.exists(scheduleFilename(inputFilename)):
+        with open(scheduleFilename(inputFilename)) as f:
+            initialSchedule = json.load(f)['scheduled']
+        html = html.replace('let initialSchedule = undefined;', f'let initialSchedule = {compactJSON(initialSchedule)};')
 
     with open(interfaceFilename(inputFilename), 'w') as f:
         f.write(html)
 
+def scheduleFilename(inputFilename):
+    return os.path.splitext(inputFilename)[0] + '.schedule.json'
+
+'''
+Assigns every meeting a start time such that no two meetings overlap.
+Search is a branch-and-bound over meetings, always expanding the meeting with the fewest
+  remaining start times (most-constrained-first), trying start times that eliminate the fewest
+  options for other meetings first, and propagating each placement into the domains of the
+  remaining meetings (forward checking).
+If not every meeting can be placed, the assignment that places the most meetings is returned.
+Returns:
+ - Dictionary from meeting name to {'day', 'time'} of its start slot
+ - List of names of meetings that could not be placed
+'''
+def solveSchedule(inp, avail, maxSteps=200000):
+    meetings = inp['meetingsToSchedule']
+    days = roundDays(inp['myAvailability'])
+    myMask = dayslots2mask(inp['myAvailability'], days)
+
+    # Enumerate the possible start slots for each meeting; a start occupies all of the
+    #  back-to-back slots it needs
+    cell2starts = {}
+    domains = []
+    for i,meeting in enumerate(meetings):
+        nslots = int(meeting['length'] / 30)
+        valid = daytimes2mask(avail.get(meeting['name'], {}), days) & myMask
+        domain = set(maskIndices(meetingStarts(valid, nslots)))
+        for start in domain:
+            for cell in range(start, start + nslots):
+                cell2starts.setdefault(cell, []).append((i, start))
+        domains.append(domain)
+    def cellsOf(i, start):
+        return range(start, start + int(meetings[i]['length'] / 30))
+
+    assignment = {}
+    unassigned = set(range(len(meetings)))
+    best = {'assignment': {}}
+    steps = 0
+
+    def conflicts(i, start):
+        return [(j, s) for c in cellsOf(i, start) for j,s in cell2starts.get(c, [])
+                if j in unassigned and j != i and s in domains[j]]
+
+    def search():
+        nonlocal steps
+        steps += 1
+        # Bound: even placing every remaining meeting with a non-empty domain can't beat the best
+        bound = len(assignment) + sum(1 for j in unassigned if len(domains[j]) > 0)
+        if bound <= len(best['assignment']):
+            return
+        if len(unassigned) == 0:
+            best['assignment'] = dict(assignment)
+            return
+        if steps > maxSteps:
+            return
+        i = min(unassigned, key=lambda j: (len(domains[j]), -len(meetings[j]['participants']), j))
+        unassigned.remove(i)
+        candidates = sorted((len(conflicts(i, s)), s) for s in domains[i])
+        for _,start in candidates:
+            removed = []
+            for j,s in conflicts(i, start):
+                if s in domains[j]:
+                    domains[j].remove(s)
+                    removed.append((j, s))
+            assignment[i] = start
+            search()
+            del assignment[i]
+            for j,s in removed:
+                domains[j].add(s)
+            if len(best['assignment']) == len(meetings) or steps > maxSteps:
+                break
+        # Also consider leaving this meeting unplaced
+        search()
+        unassigned.add(i)
+
+    search()
+
+    scheduled = {}
+    for i,start in best['assignment'].items():
+        day, slot = divmod(start, SLOTSPERDAY)
+        scheduled[meetings[i]['name']] = {'day': days[day], 'time': slot2time(slot)}
+    unplaced = [m['name'] for m in meetings if not (m['name'] in scheduled)]
+    return scheduled, unplaced
+
+def solve(inputFilename, verbose=True):
+    def log(msg):
+        if verbose:
+            print(msg)
+    inp = loadInputFile(inputFilename)
+    assert os.path.exists(availabilityFilename(inputFilename)), \
+        f'{availabilityFilename(inputFilename)} not found; run "finalize" before "solve"'
+    avail = loadAvailabilityFile(inputFilename)
+    scheduled, unplaced = solveSchedule(inp, avail)
+    with open(scheduleFilename(inputFilename), 'w') as f:
+        json.dump({'scheduled': scheduled, 'unplaced': unplaced}, f, sort_keys=True, indent=3)
+    n = len(inp['meetingsToSchedule'])
+    log(f'Scheduled {len(scheduled)} of {n} meetings; schedule saved to {scheduleFilename(inputFilename)}')
+    if len(unplaced) > 0:
+        log('The following meetings could not be placed:')
+        for name in unplaced:
+            log(f'   {name}')
+    createInterfaceHTML(inputFilename)
+    log(f'Web interface (pre-filled with this schedule) saved to {interfaceFilename(inputFilename)}')
+    return scheduled, unplaced
+
+'''
+Indexes the final availability of a round for answering queries from the scheduling interface:
+  the valid slots of each meeting (restricted to my availability) as a bitmask, and the start
+  times of each meeting at its own length, so that each query is a handful of bitmask operations.
+'''
+def buildInterfaceIndex(inp, avail):
+    days = roundDays(inp['myAvailability'])
+    mine = dayslots2mask(inp['myAvailability'], days)
+    valid = {m['name']: daytimes2mask(avail.get(m['name'], {}), days) & mine for m in inp['meetingsToSchedule']}
+    lengths = {m['name']: m['length'] for m in inp['meetingsToSchedule']}
+    return {
+        'days': days,
+        'dayIndex': {day: d for d,day in enumerate(days)},
+        'valid': valid,
+        'lengths': lengths,
+        'starts': {name: meetingStarts(valid[name], int(lengths[name] / 30)) for name in valid}
+    }
+
+__interfaceIndexes = {}
+
+'''
+Returns:
+ - The interface index (see buildInterfaceIndex) for an input file, which is rebuilt whenever the
+   input file or its final availability file changes
+'''
+def loadInterfaceIndex(inputFilename):
+    inp = loadInputFile(inputFilename)
+    avail = loadCachedFile(availabilityFilename(inputFilename), readAvailabilityFile)
+    entry = __interfaceIndexes.get(inputFilename)
+    if entry is None or entry['inp'] is not inp or entry['avail'] is not avail:
+        entry = {'inp': inp, 'avail': avail, 'index': buildInterfaceIndex(inp, avail)}
+        __interfaceIndexes[inputFilename] = entry
+    return entry['index']
+
+'''
+Checks a meeting named in a query from the scheduling interface, and the length (in minutes) that
+  the query gives it, if any. (Queries come from outside, so these checks raise ValueError rather
+  than asserting.)
+Returns:
+ - The meeting's length: the one given, or else the one in the index
+'''
+def queryLength(index, name, length=None):
+    if not (name in index['valid']):
+        raise ValueError(f'Unknown meeting "{name}"')
+    if length is None:
+        return index['lengths'][name]
+    if not (isinstance(length, (int, str)) and str(length).isdigit() and int(length) > 0 and int(length) % 30 == 0):
+        raise ValueError(f'Invalid length {json.dumps(length)} for meeting "{name}" (expected a positive multiple of 30 minutes)')
+    return int(length)
+
+'''
+Returns:
+ - Bitmask of the slots that a meeting of the given length (see queryLength) placed at day and time
+   occupies
+'''
+def placementMask(index, day, time, length):
+    if not (day in index['dayIndex']):
+        raise ValueError(f'"{day}" is not one of the days being scheduled')
+    nslots = length // 30
+    slot = time2slot(time)
+    if slot + nslots > SLOTSPERDAY:
+        raise ValueError(f'A {length}-minute meeting at {time} would run past midnight')
+    return ((1 << nslots) - 1) << (index['dayIndex'][day] * SLOTSPERDAY + slot)
+
+'''
+Returns:
+ - Bitmask of the slots occupied by the meetings in scheduled (a dictionary from meeting name to
+   its {'day', 'time'} and optionally 'length'), other than the meeting named exclude
+'''
+def occupiedMask(index, scheduled, exclude=None):
+    occupied = 0
+    for name,placement in scheduled.items():
+        if name != exclude:
+            occupied |= placementMask(index, placement['day'], placement['time'], queryLength(index, name, placement.get('length')))
+    return occupied
+
+'''
+Returns:
+ - Bitmask of the start times of a meeting, given the length it now has and the slots that other
+   meetings already occupy
+'''
+def validStarts(index, name, length=None, occupied=0):
+    length = queryLength(index, name, length)
+    if occupied == 0 and length == index['lengths'][name]:
+        return index['starts'][name]
+    return meetingStarts(index['valid'][name] & ~occupied, length // 30)
+
+'''
+Like mask2daytimes, but only includes days that have some slot set (so its size depends on the
+  number of slots set rather than on the number of days)
+'''
+def mask2sparseDaytimes(mask, days):
+    daytimes = {}
+    for i in maskIndices(mask):
+        day, slot = divmod(i, SLOTSPERDAY)
+        daytimes.setdefault(days[day], []).append(slot2time(slot))
+    return daytimes
+
+'''
+Answers a query from the scheduling interface.
+Queries:
+ - 'starts' (meeting, length): Valid start times of a meeting
+ - 'check' (meeting, day, time, length, scheduled): Whether a meeting can be placed at a time given
+   the meetings already scheduled, which of those it would overlap, and how many start times the
+   placement would take away from each meeting that has not been scheduled
+ - 'remaining' (scheduled, lengths): Valid slots and start times of every meeting that has not been
+   scheduled, given the meetings that have been
+Returns:
+ - The answer, as a JSON-serializable dictionary
+'''
+def interfaceQuery(index, query, args):
+    days = index['days']
+    scheduled = args.get('scheduled', {})
+    lengths = args.get('lengths', {})
+    if query == 'starts':
+        starts = validStarts(index, args['meeting'], args.get('length'))
+        return {'meeting': args['meeting'], 'starts': mask2sparseDaytimes(starts, days), 'count': popcount(starts)}
+    elif query == 'check':
+        name = args['meeting']
+        length = queryLength(index, name, args.get('length'))
+        placement = placementMask(index, args['day'], args['time'], length)
+        start = placement & -placement
+        occupied = occupiedMask(index, scheduled, exclude=name)
+        overlaps = [other for other,p in scheduled.items() if other != name and
+            placementMask(index, p['day'], p['time'], queryLength(index, other, p.get('length'))) & placement]
+        takenAway = {}
+        for other in index['valid']:
+            if other == name or other in scheduled:
+                continue
+            before = validStarts(index, other, lengths.get(other), occupied)
+            lost = popcount(before & ~validStarts(index, other, lengths.get(other), occupied | placement))
+            if lost > 0:
+                takenAway[other] = lost
+        return {
+            'valid': bool(validStarts(index, name, length, occupied) & start),
+            'overlaps': overlaps,
+            'startsTakenAway': takenAway
+        }
+    elif query == 'remaining':
+        remaining = {}
+        occupied = occupiedMask(index, scheduled)
+        for name in index['valid']:
+            if name in scheduled:
+                continue
+            starts = validStarts(index, name, lengths.get(name), occupied)
+            remaining[name] = {
+                'slots': mask2sparseDaytimes(index['valid'][name] & ~occupied, days),
+                'starts': mask2sparseDaytimes(starts, days),
+                'count': popcount(starts)
+            }
+        return {'meetings': remaining}
+    raise ValueError(f'Unknown query "{query}"')
+
+INTERFACEPORT = 8000
+# Responses smaller than this are not worth compressing
+GZIPMINBYTES = 1024
+
+'''
+Returns:
+ - The scheduling interface page for an input file as served by serve-ui (which tells the page to
+   send its queries to the server), along with its gzipped form and ETag
+'''
+def readInterfaceResponse(filename):
+    with open(filename) as f:
+        html = f.read()
+    body = html.replace('let serverAPI = undefined;', "let serverAPI = '/api';").encode('utf-8')
+    return {'body': body, 'gzip': gzip.compress(body), 'etag': '"' + hashlib.sha1(body).hexdigest() + '"'}
+
+class InterfaceRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def respond(self, status, body=b'', headers={}, compressed=None):
+        self.send_response(status)
+        if len(body) >= GZIPMINBYTES and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = compressed if compressed is not None else gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Vary', 'Accept-Encoding')
+        for key,value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def respondJSON(self, status, j):
+        self.respond(status, compactJSON(j).encode('utf-8'), {'Content-Type': 'application/json', 'Cache-Control': 'no-store'})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        inputFilename = self.server.inputFilename
+        if url.path in ('/', '/' + os.path.basename(interfaceFilename(inputFilename))):
+            page = loadCachedFile(interfaceFilename(inputFilename), readInterfaceResponse)
+            # The browser may keep the page, but must check that it is still current before using it
+            headers = {'ETag': page['etag'], 'Cache-Control': 'no-cache'}
+            if self.headers.get('If-None-Match') == page['etag']:
+                self.respond(304, headers=headers)
+            else:
+                self.respond(200, page['body'], {**headers, 'Content-Type': 'text/html; charset=utf-8'}, page['gzip'])
+        elif url.path.startswith('/api/'):
+            args = {key: values[0] for key,values in parse_qs(url.query).items()}
+            self.query(url.path[len('/api/'):], args)
+        else:
+            self.respond(404)
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if not url.path.startswith('/api/'):
+            self.respond(404)
+            return
+        try:
+            args = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        except json.JSONDecodeError as e:
+            self.respondJSON(400, {'error': str(e)})
+            return
+        self.query(url.path[len('/api/'):], args)
+
+    def query(self, query, args):
+        with timedPhase('serveUI.query'):
+            try:
+                answer = interfaceQuery(loadInterfaceIndex(self.server.inputFilename), query, args)
+            except (AssertionError, KeyError, ValueError, TypeError, AttributeError) as e:
+                self.respondJSON(400, {'error': str(e)})
+                return
+        countMetric('interfaceQueries')
+        self.respondJSON(200, answer)
+
+'''
+Serves the scheduling interface for an input file at http://localhost:8000, along with JSON
+  endpoints (under /api/) that answer the interface's queries about valid meeting times from an
+  index of the round's final availability (see interfaceQuery), so that the page doesn't have to
+  work them out itself. The interface is (re)created first, and is served again whenever it is
+  recreated (e.g. by running "solve") while this is running.
+'''
+def serveInterface(inputFilename, verbose=True):
+    def log(msg):
+        if verbose:
+            print(msg)
+    assert os.path.exists(availabilityFilename(inputFilename)), \
+        f'{availabilityFilename(inputFilename)} not found; run "finalize" before "serve-ui"'
+    createInterfaceHTML(inputFilename)
+    loadInterfaceIndex(inputFilename)
+    server = ThreadingHTTPServer(('localhost', INTERFACEPORT), InterfaceRequestHandler)
+    server.daemon_threads = True
+    server.inputFilename = inputFilename
+    server.verbose = verbose
+    log(f'Serving the scheduling interface at http://localhost:{INTERFACEPORT}/ (press Ctrl+C to stop)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+'''
+Sets up a worker process of the pool used by checkAll and finalizeAll, so that it shares the
+  config and people directory loaded by the main process rather than loading its own (a SQLite or
+  CSV people directory is not shared, since workers only read the people they need from it)
+'''
+def initWorker(config, people):
+    global __config, __people, __inWorker
+    __config = config
+    __people = people
+    __inWorker = True
+
+'''
+Returns:
+ - Process pool for fanning work on several input files out over all CPUs
+'''
+def workerPool():
+    return ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn'),
+        initializer=initWorker, initargs=(loadConfig(), loadPeople() if peopleDirectoryFilename().endswith('.json') else None))
+
+'''
+Checks progress (see checkProgress) for every input file in a directory that has been started, then
+  prints a summary of all of them.
+Each when2meet is only downloaded once, even if it is used by several input files, and the parsing
+  and viability work is spread over a process pool.
+Returns:
+ - Dictionary from input filename to its updated progress data (or to the exception raised while
+   checking it)
+'''
+@instrumentedOperation
+def checkAll(dirname, verbose=True):
+    def log(msg):
+        if verbose:
+            print(msg)
+
+    inputFilenames = startedInputFiles(dirname)
+    start = time.perf_counter()
+    with timedPhase('loadProgress'):
+        rounds = {filename: (loadInputFile(filename), loadProgressFile(filename)) for filename in inputFilenames}
+    progs = {}
+    with workerPool() as pool:
+        results = getAllWhen2Meets(rounds, pool)
+        futures = {filename: pool.submit(workerCall, updateProgress, filename, *rounds[filename],
+            picklableWhen2Meets(results[filename][0]), results[filename][1], False) for filename in inputFilenames}
+        for filename,future in futures.items():
+            try:
+                progs[filename] = workerResult(future)
+            except Exception as e:
+                progs[filename] = e
+    nurls = len(set(meeting['when2meet'] for inp,prog in rounds.values() for meeting in prog))
+
+    log(f'{"Input file":<32} {"Meetings":>8} {"Responded":>10} {"Changed":>8} {"Failed":>7}  Fewest viable times')
+    for filename in inputFilenames:
+        prog = progs[filename]
+        if isinstance(prog, Exception):
+            log(f'{os.path.basename(filename):<32} Could not check ({prog})')
+            continue
+        when2meets, changed = results[filename]
+        nresponded = sum([len(meeting['hasResponded']) for meeting in prog])
+        nparticipants = nresponded + sum([len(meeting['hasNotResponded']) for meeting in prog])
+        nfailed = len([w for w in when2meets.values() if isinstance(w, Exception)])
+        fewest = min(prog, key=lambda m: m['numViableMeetingTimesSoFar'], default=None)
+        fewest = '' if fewest is None else f'{fewest["numViableMeetingTimesSoFar"]} ({fewest["name"]})'
+        log(f'{os.path.basename(filename):<32} {len(prog):>8} {f"{nresponded}/{nparticipants}":>10} {len(changed):>8} {nfailed:>7}  {fewest}')
+    log(f'Checked {len(inputFilenames)} input files ({nurls} unique when2meets) in {time.perf_counter() - start:.1f} seconds')
+    return progs
+
+'''
+Finalizes (see finalize) every input file in a directory that has been started, then prints a
+  summary of all of them.
+Any when2meets that have not been downloaded yet are downloaded once up front (see
+  getAllWhen2Meets), and the input files are then finalized in parallel on a process pool.
+Returns:
+ - Dictionary from input filename to None (or to the exception raised while finalizing it)
+'''
+@instrumentedOperation
+def finalizeAll(dirname, verbose=True):
+    def log(msg):
+        if verbose:
+            print(msg)
+
+    inputFilenames = startedInputFiles(dirname)
+    start = time.perf_counter()
+    with timedPhase('loadProgress'):
+        rounds = {filename: (loadInputFile(filename), loadProgressFile(filename)) for filename in inputFilenames}
+    errors = {}
+    with workerPool() as pool:
+        getAllWhen2Meets(rounds, pool, refresh=False)
+        futures = {filename: pool.submit(workerCall, finalize, filename, False) for filename in inputFilenames}
+        for filename,future in futures.items():
+            try:
+                errors[filename] = workerResult(future)
+            except Exception as e:
+                errors[filename] = e
+
+    for filename in inputFilenames:
+        if errors[filename] is None:
+            log(f'{os.path.basename(filename):<32} Finalized; web interface saved to {interfaceFilename(filename)}')
+        else:
+            log(f'{os.path.basename(filename):<32} Could not finalize ({errors[filename]})')
+    nfinalized = len([e for e in errors.values() if e is None])
+    log(f'Finalized {nfinalized} of {len(inputFilenames)} input files in {time.perf_counter() - start:.1f} seconds')
+    return errors
+
+def runOperation(operation, inputFile):
+    if operation == 'start':
+        initScheduling(inputFile);
+        doPeriodicChecksAndReminders(inputFile);
+    elif operation == 'resume':
+        doPeriodicChecksAndReminders(inputFile);
+    elif operation == 'finalize':
+        finalize(inputFile)
+    elif operation == 'solve':
+        solve(inputFile)
+    elif operation == 'check':
+        checkProgress(inputFile)
+    elif operation == 'remind':
+        sendReminderEmails(inputFile)
+    elif operation == 'serve':
+        serveDirectory(inputFile)
+    elif operation == 'export':
+        exportProgressStore(inputFile)
+    elif operation == 'remind-all':
+        sendReminderDigest(inputFile)
+    elif operation == 'check-all':
+        checkAll(inputFile)
+    elif operation == 'finalize-all':
+        finalizeAll(inputFile)
+    elif operation == 'serve-ui':
+        serveInterface(inputFile)
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -674,29 +3295,33 @@ if __name__ == '__main__':
     - start: Creates when2meets, sends emails to participants, and starts a persistent loop that checks for progress and sends reminder emails
     - resume: Restarts the persistent check/remind loop (e.g. if the process crashed)
     - finalize: Save final participant availabilities and create the scheduling web interface
+    - solve: Automatically find a non-overlapping schedule for all meetings and pre-fill the scheduling web interface with it
     - check: Checks when2meets for current participant availability
     - remind: Send reminder emails to participants who have not yet responded
+    - serve: Runs the persistent check/remind loop for every input file in a directory that has been started but not yet finalized, in a single process
+    - export: Writes the contents of the SQLite progress store back out to the JSON progress file, email log, and final availability file
+    - check-all: Checks progress for every input file in a directory that has been started, downloading each when2meet only once, and prints a summary
+    - remind-all: Sends one reminder email to each person covering all of their unfilled when2meets in every active input file in a directory
+    - finalize-all: Finalizes every input file in a directory that has been started, and prints a summary
+    - serve-ui: Serves the scheduling web interface at http://localhost:8000, answering its queries about valid meeting times
 '''));
     parser.add_argument('operation',
         type=str,
-        choices=['start', 'resume', 'finalize', 'check', 'remind'],
+        choices=['start', 'resume', 'finalize', 'solve', 'check', 'remind', 'serve', 'export', 'check-all', 'remind-all', 'finalize-all', 'serve-ui'],
         help='Operation to perform');
     parser.add_argument('inputFile',
         type=str,
-        help='Path to the input JSON file specifying meetings to schedule');
+        help='Path to the input JSON file specifying meetings to schedule (for "serve", "check-all", "remind-all" and "finalize-all", a directory containing input files)');
+    parser.add_argument('--profile',
+        action='store_true',
+        help='Run the operation under cProfile and save the profile to <inputBasename>.<operation>.prof');
     args = parser.parse_args()
 
-    if args.operation == 'start':
-        initScheduling(args.inputFile);
-        doPeriodicChecksAndReminders(args.inputFile);
-    elif args.operation == 'resume':
-        doPeriodicChecksAndReminders(args.inputFile);
-    elif args.operation == 'finalize':
-        finalize(args.inputFile)
-    elif args.operation == 'check':
-        checkProgress(args.inputFile)
-    elif args.operation == 'remind':
-        sendReminderEmails(args.inputFile)
+    if args.profile:
+        profileFilename = f'{os.path.splitext(os.path.normpath(args.inputFile))[0]}.{args.operation}.prof'
+        profileCall(profileFilename, runOperation, args.operation, args.inputFile)
+    else:
+        runOperation(args.operation, args.inputFile)
 
     # r = createWhen2Meet('Test', 'America/New_York', DAYS, '9:00 AM', '5:00 PM')
     # r = parseWhen2Meet('https://www.when2meet.com/?8079662-q5hqG')
@@ -720,4 +3345,3 @@ if __name__ == '__main__':
     # ]))
     # print(json.dumps(loadInputFile('test.json'), sort_keys=True, indent=3))
     # createInterfaceHTML('test.json')
-    
\ No newline at end of file
@@ -0,0 +1,48 @@
+import os
+import sys
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+dirPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(dirPath))
+import optimeet
+
+ZONE = 'America/New_York'
+DATES = [date(2024, 3, 4) + timedelta(days=i) for i in range(5)]
+
+'''
+Writes an iCalendar file to dirname with one event per dictionary of properties in events, and
+  returns its filename
+'''
+def writeCalendar(dirname, events):
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0']
+    for k,event in enumerate(events):
+        lines += ['BEGIN:VEVENT', f'UID:event{k}'] + [f'{name}:{value}' for name,value in event.items()] + ['END:VEVENT']
+    lines.append('END:VCALENDAR')
+    filename = os.path.join(dirname, 'calendar.ics')
+    with open(filename, 'w') as f:
+        f.write('\r\n'.join(lines) + '\r\n')
+    return filename
+
+def expand(rrule):
+    start = datetime(2024, 1, 1, 9, tzinfo=ZoneInfo(ZONE))
+    windowStart = datetime(2024, 3, 4, tzinfo=ZoneInfo(ZONE))
+    return list(optimeet.expandRecurrence(start, rrule, timedelta(hours=1), windowStart, windowStart + timedelta(days=5)))
+
+def test_recurrenceOnNonexistentDate():
+    assert expand('FREQ=YEARLY;BYMONTH=2;BYMONTHDAY=30') == []
+
+def test_recurrenceOnUnknownWeekday():
+    assert expand('FREQ=DAILY;BYDAY=XX') == []
+
+def test_malformedEventsAreSkipped(tmp_path):
+    valid = {'SUMMARY': 'Standup', 'DTSTART;TZID=America/New_York': '20240304T090000', 'DURATION': 'PT1H', 'RRULE': 'FREQ=DAILY;COUNT=5'}
+    filename = writeCalendar(tmp_path, [
+        {**valid, 'DURATION': 'one hour'},
+        {**valid, 'RRULE': 'FREQ=WEEKLY;BYDAY=XX'},
+        {**valid, 'RRULE': 'FREQ=DAILY;UNTIL=tomorrow'},
+        {**valid, 'RRULE': 'FREQ=DAILY;INTERVAL=0'},
+        valid
+    ])
+    busy = optimeet.calendarBusyIntervals(filename, DATES, ZONE)
+    assert busy == [[(18, 20, ['Standup'])]] * 5
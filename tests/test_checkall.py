@@ -0,0 +1,79 @@
+import json
+import os
+import sys
+
+dirPath = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(dirPath))
+sys.path.insert(0, os.path.join(os.path.dirname(dirPath), 'benchmarks'))
+import optimeet
+from servers import When2MeetServer
+from when2meetpages import DAYS, when2MeetPage
+
+PEOPLE = {f'p{i}': {'name': f'First{i} Last{i}', 'email': f'p{i}@example.com'} for i in range(8)}
+
+'''
+Creates two started rounds in dirname, with two meetings each, where each meeting has one
+  respondent; meetingURLs maps the event IDs of each round's meetings to pages
+'''
+def setUpRounds(dirname, server, meetingURLs):
+    for k,urls in enumerate(meetingURLs):
+        inputFilename = os.path.join(dirname, f'round{k}.json')
+        with open(inputFilename, 'w') as f:
+            json.dump({
+                'myAvailability': {day: [['9:00 AM', '4:30 PM']] for day in DAYS[1:6]},
+                'myLocations': {'remote': 'https://example.com/zoom'},
+                'meetingsToSchedule': [
+                    {'name': 'A', 'type': 'remote', 'participants': [f'p{2*k}', 'p7']},
+                    {'name': 'B', 'type': 'remote', 'participants': [f'p{2*k+1}', 'p7']}
+                ]
+            }, f)
+        inp = optimeet.loadInputFile(inputFilename)
+        for meeting,url in zip(inp['meetingsToSchedule'], urls):
+            meeting['when2meet'] = url
+        optimeet.createProgressFile(inputFilename, inp)
+
+def startServer(monkeypatch, **config):
+    server = When2MeetServer().start()
+    monkeypatch.setattr(optimeet, '__people', PEOPLE)
+    monkeypatch.setattr(optimeet, '__config', {**optimeet.loadConfig(), 'when2meetServer': server.url, 'fetchRetries': 0, **config})
+    for i in range(4):
+        server.setEvent(f'event{i}', when2MeetPage(DAYS[1:6], 9, 17, [(PEOPLE[f'p{i}']['name'], 100 + i)], seed=i))
+    return server
+
+def test_checkAllWithMissingWhen2Meet(tmp_path, monkeypatch):
+    server = startServer(monkeypatch)
+    try:
+        # The first round's second meeting points at a when2meet that doesn't exist
+        setUpRounds(str(tmp_path), server, [[f'{server.url}/?event0', f'{server.url}/?missing'],
+            [f'{server.url}/?event2', f'{server.url}/?event3']])
+
+        progs = optimeet.checkAll(str(tmp_path), verbose=False)
+
+        assert not any(isinstance(prog, Exception) for prog in progs.values())
+        prog0 = optimeet.loadProgressFile(str(tmp_path / 'round0.json'))
+        assert [meeting['hasResponded'] for meeting in prog0] == [['p0'], []]
+        prog1 = optimeet.loadProgressFile(str(tmp_path / 'round1.json'))
+        assert [meeting['hasResponded'] for meeting in prog1] == [['p2'], ['p3']]
+    finally:
+        server.stop()
+
+def test_checkAllExportsWorkerMetrics(tmp_path, monkeypatch):
+    metricsFilename = str(tmp_path / 'metrics.prom')
+    server = startServer(monkeypatch, metricsPrometheusFile=metricsFilename)
+    try:
+        setUpRounds(str(tmp_path), server, [[f'{server.url}/?event{i}' for i in range(2)],
+            [f'{server.url}/?event{i}' for i in range(2, 4)]])
+        countersBefore, phasesBefore = optimeet.metricsSnapshot()
+
+        optimeet.checkAll(str(tmp_path), verbose=False)
+
+        # Pages are parsed and progress is updated in worker processes
+        counters, phases = optimeet.metricsSince(countersBefore, phasesBefore)
+        assert phases['saveProgress'][0] == 2
+        assert counters['slotsParsed'] == 4 * 5 * 8 * 4
+        with open(metricsFilename) as f:
+            metrics = f.read()
+        assert 'optimeet_phase_runs_total{phase="saveProgress"}' in metrics
+        assert 'optimeet_phase_runs_total{phase="checkAll"}' in metrics
+    finally:
+        server.stop()